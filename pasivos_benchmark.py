@@ -0,0 +1,311 @@
+# =================================================================
+# BENCHMARKS DE RENDIMIENTO
+# Mide tiempo y pico de memoria (RSS) de generadores, análisis e informes
+# =================================================================
+#
+# Uso:
+#   python pasivos_benchmark.py                       # compara con la línea base
+#   python pasivos_benchmark.py --tamanos 1000,100000 --casos generar_prestamos
+#   python pasivos_benchmark.py --guardar-baseline    # reemplaza la línea base
+#   python pasivos_benchmark.py --importacion         # tiempo de importación por paquete
+#
+# Cada (caso, tamaño) corre en un proceso nuevo, con las cachés de Streamlit
+# vacías y la caché Parquet desactivada, así se mide el cálculo en frío y el
+# pico de memoria no arrastra lo que dejaron los casos anteriores. Para los
+# informes el tamaño es el total de filas, repartido entre las cuatro tablas.
+# Sale con código 1 si algún caso supera la línea base más la tolerancia.
+#
+# --importacion mide el arranque en frío con ``python -X importtime``: suma
+# el tiempo propio de cada módulo por paquete raíz y sale con código 1 si
+# alguna de las librerías que la app difiere se carga al importarla.
+
+import argparse
+import importlib
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+RUTA_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+TAMANOS = (1_000, 100_000, 1_000_000)
+
+# Diferencias menores a estos mínimos se consideran ruido aunque superen la tolerancia
+MINIMO_SEGUNDOS = 0.05
+MINIMO_MB = 20
+PAQUETES_IMPORTACION = 12
+# La app importa estas librerías al primer uso; se cargan antes de medir
+# para que los casos no incluyan la importación (ver --importacion)
+MODULOS_DIFERIDOS = ('sklearn.ensemble', 'scipy.stats', 'faker', 'joblib', 'xlsxwriter',
+                     'reportlab.platypus')
+
+
+def _preparar_cuentas(app, filas):
+    return app.generar_cuentas_por_pagar(filas)
+
+
+def _preparar_detector(app, filas):
+    df = app.generar_cuentas_por_pagar(filas)
+    return df, app.DetectorAnomalias().ajustar(df)
+
+
+def _preparar_datos(app, filas):
+    cuarto = max(filas // 4, 1)
+    return app.generar_datos_consolidados(cuarto, cuarto, cuarto, cuarto)
+
+
+def _analizar(app, contexto):
+    app.puntuar_cuentas_por_pagar(*contexto)
+
+
+def _informe(constructor):
+    def ejecutar(app, datos):
+        getattr(app, constructor)(datos).close()
+    return ejecutar
+
+
+def _generador(nombre, cacheada=None):
+    """Llama a ``nombre`` con la caché de ``cacheada`` (por defecto, la suya) vacía."""
+    def ejecutar(app, filas):
+        getattr(app, cacheada or nombre).clear()
+        getattr(app, nombre)(filas)
+    return ejecutar
+
+
+# Caso -> (preparación sin medir, ejecución medida)
+CASOS = {
+    'generar_cuentas_por_pagar': (lambda app, filas: filas, _generador('generar_cuentas_por_pagar')),
+    'generar_prestamos': (lambda app, filas: filas, _generador('generar_prestamos')),
+    'generar_remuneraciones': (lambda app, filas: filas, _generador('generar_remuneraciones', '_generar_remuneraciones')),
+    'generar_cargas_fiscales': (lambda app, filas: filas, _generador('generar_cargas_fiscales')),
+    'ajustar_detector': (_preparar_cuentas, lambda app, df: app.DetectorAnomalias().ajustar(df)),
+    'analizar_cuentas_por_pagar': (_preparar_detector, _analizar),
+    'crear_informe_pdf_simple': (_preparar_datos, _informe('crear_informe_pdf_simple')),
+    'crear_informe_excel': (_preparar_datos, _informe('crear_informe_excel')),
+    'crear_informe_auditoria_normas': (_preparar_datos, _informe('crear_informe_auditoria_normas'))
+}
+
+
+def _memoria_mb():
+    """RSS actual y pico del proceso en MB (``VmRSS``/``VmHWM``; ``ru_maxrss`` fuera de Linux)."""
+    try:
+        with open('/proc/self/status') as archivo:
+            campos = dict(linea.split(':', 1) for linea in archivo if linea.startswith('Vm'))
+        return int(campos['VmRSS'].split()[0]) / 1024, int(campos['VmHWM'].split()[0]) / 1024
+    except (OSError, KeyError):
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        pico /= 1024 ** 2 if sys.platform == 'darwin' else 1024
+        return pico, pico
+
+
+def _reiniciar_pico_rss():
+    """Lleva el pico de RSS al valor actual para medir sólo lo que sigue (Linux >= 4.0)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as archivo:
+            archivo.write('5')
+    except OSError:
+        pass
+
+
+def medir_caso(caso, filas, repeticiones=1):
+    """Corre un caso en este proceso y devuelve el mejor tiempo y el pico de RSS."""
+    import streamlit.logger
+    streamlit.logger.set_log_level('error')
+    import pasivos_corrientes_app as app
+    for modulo in MODULOS_DIFERIDOS:
+        importlib.import_module(modulo)
+
+    preparar, ejecutar = CASOS[caso]
+    contexto = preparar(app, filas)
+    tiempos = []
+    rss_base, rss_pico = _memoria_mb()
+    for _ in range(repeticiones):
+        _reiniciar_pico_rss()
+        rss_base = _memoria_mb()[0]
+        inicio = time.perf_counter()
+        ejecutar(app, contexto)
+        tiempos.append(time.perf_counter() - inicio)
+        rss_pico = _memoria_mb()[1]
+    return {
+        'segundos': round(min(tiempos), 4),
+        'rss_pico_mb': round(rss_pico, 1),
+        'rss_incremento_mb': round(rss_pico - rss_base, 1)
+    }
+
+
+def _medir_en_proceso(caso, filas, repeticiones):
+    """Lanza ``medir_caso`` en un intérprete nuevo, sin caché en disco compartida."""
+    with tempfile.TemporaryDirectory(prefix='pasivos_benchmark_') as directorio:
+        entorno = dict(os.environ, PASIVOS_DIRECTORIO_DATOS=directorio, PASIVOS_LIMITE_CACHE_MB='0')
+        proceso = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--medir', caso,
+             '--tamanos', str(filas), '--repeticiones', str(repeticiones)],
+            env=entorno, capture_output=True, text=True)
+    if proceso.returncode != 0:
+        raise RuntimeError(f"{caso} ({filas:,} filas) falló:\n{proceso.stderr.strip()}")
+    return json.loads(proceso.stdout.strip().splitlines()[-1])
+
+
+def _importar_en_proceso():
+    """Importa la app en un intérprete nuevo y devuelve ``{módulo: µs propios}`` de ``-X importtime``."""
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import pasivos_corrientes_app'],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    if proceso.returncode != 0:
+        raise RuntimeError(f"La importación falló:\n{proceso.stderr.strip()}")
+    modulos = {}
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith('import time:'):
+            continue
+        propio, _, nombre = linea[len('import time:'):].split('|')
+        if propio.strip().isdigit():
+            modulos[nombre.strip()] = int(propio)
+    return modulos
+
+
+def medir_importacion(repeticiones=1):
+    """Segundos de importación por paquete raíz en la corrida más rápida, de mayor a menor."""
+    corridas = [_importar_en_proceso() for _ in range(repeticiones)]
+    modulos = min(corridas, key=lambda corrida: sum(corrida.values()))
+    paquetes = {}
+    for nombre, microsegundos in modulos.items():
+        raiz = nombre.split('.')[0]
+        paquetes[raiz] = paquetes.get(raiz, 0) + microsegundos / 1e6
+    return dict(sorted(paquetes.items(), key=lambda item: item[1], reverse=True))
+
+
+def informar_importacion(repeticiones=1):
+    """Imprime el tiempo de importación por paquete; 1 si se cargó alguna librería diferida."""
+    import streamlit.logger
+    streamlit.logger.set_log_level('error')
+    from pasivos_corrientes_app import LIBRERIAS_DIFERIDAS
+
+    paquetes = medir_importacion(repeticiones)
+    print(f"{'Paquete':<32}{'Segundos':>11}")
+    for paquete, segundos in itertools.islice(paquetes.items(), PAQUETES_IMPORTACION):
+        print(f"{paquete:<32}{segundos:>11.3f}")
+    print(f"{'Total':<32}{sum(paquetes.values()):>11.3f}")
+    cargadas = [libreria for libreria, modulo in LIBRERIAS_DIFERIDAS.items() if modulo in paquetes]
+    if cargadas:
+        print(f"REGRESIÓN: se cargan al importar la app: {', '.join(cargadas)}")
+        return 1
+    print("Ninguna librería diferida se carga al importar la app.")
+    return 0
+
+
+def describir_entorno():
+    import numpy
+    import pandas
+    return {
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'pandas': pandas.__version__,
+        'numpy': numpy.__version__
+    }
+
+
+def comparar(resultados, baseline, tolerancia=0.5, tolerancia_memoria=0.25):
+    """Lista de regresiones ``(caso, filas, métrica, actual, base)`` respecto de la línea base."""
+    regresiones = []
+    for caso, por_tamano in resultados.items():
+        for filas, actual in por_tamano.items():
+            base = baseline.get(caso, {}).get(filas)
+            if base is None:
+                continue
+            metricas = (('segundos', tolerancia, MINIMO_SEGUNDOS),
+                        ('rss_incremento_mb', tolerancia_memoria, MINIMO_MB))
+            for metrica, tolerancia_metrica, minimo in metricas:
+                limite = base[metrica] * (1 + tolerancia_metrica)
+                if actual[metrica] > limite and actual[metrica] - base[metrica] > minimo:
+                    regresiones.append((caso, filas, metrica, actual[metrica], base[metrica]))
+    return regresiones
+
+
+def _lista(texto, conversion=str):
+    return [conversion(valor.strip()) for valor in texto.split(',') if valor.strip()]
+
+
+def _parsear_argumentos(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Mide tiempo y memoria de la generación, el análisis y los informes.")
+    parser.add_argument('--casos', default=','.join(CASOS),
+                        help="Casos a medir, separados por coma (por defecto, todos)")
+    parser.add_argument('--tamanos', default=','.join(str(filas) for filas in TAMANOS),
+                        help="Cantidad de filas por caso, separadas por coma")
+    parser.add_argument('--repeticiones', type=int, default=1,
+                        help="Corridas por caso; se informa el mejor tiempo")
+    parser.add_argument('--baseline', default=RUTA_BASELINE, help="Archivo JSON de la línea base")
+    parser.add_argument('--guardar-baseline', action='store_true',
+                        help="Guarda los resultados como nueva línea base en lugar de comparar")
+    parser.add_argument('--tolerancia', type=float, default=0.5,
+                        help="Aumento de tiempo admitido sobre la línea base (0.5 = +50%%)")
+    parser.add_argument('--tolerancia-memoria', type=float, default=0.25,
+                        help="Aumento del pico de memoria admitido sobre la línea base")
+    parser.add_argument('--importacion', action='store_true',
+                        help="Mide el tiempo de importación de la app por paquete en lugar de los casos")
+    parser.add_argument('--salida', default=None, help="Escribe también los resultados en este JSON")
+    parser.add_argument('--medir', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    args.casos = _lista(args.casos)
+    desconocidos = set(args.casos) - set(CASOS)
+    if desconocidos:
+        parser.error(f"Casos desconocidos: {', '.join(sorted(desconocidos))}")
+    args.tamanos = _lista(args.tamanos, int)
+    return args
+
+
+def main(argv=None):
+    args = _parsear_argumentos(argv)
+    if args.medir:
+        print(json.dumps(medir_caso(args.medir, args.tamanos[0], args.repeticiones)))
+        return 0
+    if args.importacion:
+        return informar_importacion(args.repeticiones)
+
+    baseline = {}
+    if not args.guardar_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as archivo:
+            guardada = json.load(archivo)
+        baseline = guardada['resultados']
+        if guardada.get('entorno', {}).get('cpus') != os.cpu_count():
+            print(f"Aviso: la línea base se midió con {guardada['entorno'].get('cpus')} CPUs "
+                  f"y esta máquina tiene {os.cpu_count()}; los tiempos no son comparables.")
+
+    resultados = {}
+    print(f"{'Caso':<32}{'Filas':>11}{'Segundos':>11}{'RSS pico MB':>13}{'Δ RSS MB':>10}{'Base s':>9}")
+    for caso in args.casos:
+        for filas in args.tamanos:
+            medicion = _medir_en_proceso(caso, filas, args.repeticiones)
+            resultados.setdefault(caso, {})[str(filas)] = medicion
+            base = baseline.get(caso, {}).get(str(filas), {}).get('segundos')
+            print(f"{caso:<32}{filas:>11,}{medicion['segundos']:>11.3f}{medicion['rss_pico_mb']:>13.1f}"
+                  f"{medicion['rss_incremento_mb']:>10.1f}{'' if base is None else f'{base:.3f}':>9}",
+                  flush=True)
+
+    documento = {'entorno': describir_entorno(), 'resultados': resultados}
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            json.dump(documento, archivo, indent=2, ensure_ascii=False)
+    if args.guardar_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as archivo:
+            json.dump(documento, archivo, indent=2, ensure_ascii=False)
+            archivo.write('\n')
+        print(f"Línea base guardada en {args.baseline}")
+        return 0
+
+    regresiones = comparar(resultados, baseline, args.tolerancia, args.tolerancia_memoria)
+    for caso, filas, metrica, actual, base in regresiones:
+        print(f"REGRESIÓN {caso} ({int(filas):,} filas): {metrica} {actual:.3f} vs base {base:.3f}")
+    if not baseline:
+        print("Sin línea base para comparar; usar --guardar-baseline para crearla.")
+    return 1 if regresiones else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,204 @@
+# =================================================================
+# GENERACIÓN DE INFORMES POR LOTES (SIN STREAMLIT)
+# Ejecuta el pipeline de auditoría para N entidades en paralelo
+# =================================================================
+#
+# Uso:
+#   python pasivos_cli.py --entidades 500 --salida informes/ --procesos 8
+#
+# Cada entidad usa su propia semilla (semilla base + índice) y deja sus
+# informes en <salida>/entidad_NNNN/. Con --origen DIR se procesan datos
+# reales: un subdirectorio de DIR por entidad, con los archivos que espera
+# generar_datos_consolidados(origen=...) y opcionalmente un entidad.toml
+# con "nombre" y "cuit" para el informe con normas; no puede haber dos
+# subdirectorios con la misma entidad.
+#
+# Los procesos devuelven sólo el ResumenPasivos de cada entidad; al final
+# se combinan en <salida>/consolidado.xlsx con el total del grupo.
+
+import argparse
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import streamlit.logger
+
+# Sin runtime de Streamlit los decoradores de caché emiten avisos por cada llamada
+streamlit.logger.set_log_level('error')
+
+import pasivos_corrientes_app as app
+
+try:
+    import tomllib
+except ModuleNotFoundError:  # Python < 3.11
+    import tomli as tomllib
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:  # viene con scikit-learn, pero no es obligatoria
+    threadpool_limits = None
+
+INFORMES = {
+    'pdf': ('informe.pdf', app.crear_informe_pdf_simple),
+    'excel': ('informe.xlsx', app.crear_informe_excel),
+    'normas': ('informe_auditoria.pdf', app.crear_informe_auditoria_normas)
+}
+# Informes que llevan el nombre y CUIT de la entidad (y admiten anexos)
+INFORMES_CON_ENTIDAD = {'normas'}
+
+
+def leer_entidad(directorio):
+    """Entidad descripta en ``directorio/entidad.toml``; sin archivo, el nombre del directorio."""
+    ruta = os.path.join(directorio, 'entidad.toml')
+    if not os.path.isfile(ruta):
+        return app.Entidad(os.path.basename(os.path.normpath(directorio)))
+    with open(ruta, 'rb') as archivo:
+        datos = tomllib.load(archivo)
+    return app.Entidad(datos['nombre'], datos.get('cuit', app.Entidad.cuit))
+
+
+def _limitar_hilos():
+    """Un hilo de BLAS/OpenMP por proceso, para que N procesos no compitan por N×N hilos."""
+    if threadpool_limits is not None:
+        threadpool_limits(1)
+
+
+def procesar_entidad(indice, opciones):
+    """Genera (o carga de la caché en disco) los datos de una entidad y escribe sus informes."""
+    inicio = time.perf_counter()
+    if opciones['origenes']:
+        origen = opciones['origenes'][indice - 1]
+        directorio = os.path.join(opciones['salida'], os.path.basename(origen))
+        entidad = leer_entidad(origen)
+        datos = app.generar_datos_consolidados(origen=origen)
+    else:
+        directorio = os.path.join(opciones['salida'], f'entidad_{indice:04d}')
+        entidad = app.Entidad(f'ENTIDAD {indice:04d}')
+        datos = app.generar_datos_consolidados(
+            num_cuentas=opciones['num_cuentas'],
+            num_prestamos=opciones['num_prestamos'],
+            num_empleados=opciones['num_empleados'],
+            num_obligaciones=opciones['num_obligaciones'],
+            semilla=opciones['semilla_base'] + indice,
+            fecha_referencia=opciones['fecha_referencia']
+        )
+    os.makedirs(directorio, exist_ok=True)
+    resumen = app.calcular_resumen_pasivos(datos)
+
+    archivos = []
+    for tipo in opciones['informes']:
+        nombre, constructor = INFORMES[tipo]
+        ruta = os.path.join(directorio, nombre)
+        extra = {'entidad': entidad, 'anexos': opciones['anexos']} if tipo in INFORMES_CON_ENTIDAD else {}
+        contenido = constructor(datos, resumen=resumen, **extra)
+        with open(ruta, 'wb') as archivo:
+            shutil.copyfileobj(contenido, archivo)
+        contenido.close()
+        archivos.append(ruta)
+
+    return {
+        'entidad': indice,
+        'identificacion': entidad,
+        'resumen': resumen,
+        'archivos': archivos,
+        'total_pasivos': resumen.total,
+        'segundos': time.perf_counter() - inicio
+    }
+
+
+def ejecutar_lote(entidades, opciones, procesos=None):
+    """Reparte las entidades entre ``procesos`` procesos y devuelve cada resultado al terminar."""
+    if procesos == 1:
+        for indice in entidades:
+            yield procesar_entidad(indice, opciones)
+        return
+
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_limitar_hilos) as pool:
+        futuros = [pool.submit(procesar_entidad, indice, opciones) for indice in entidades]
+        for futuro in as_completed(futuros):
+            yield futuro.result()
+
+
+def _parsear_argumentos(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Genera informes de auditoría de pasivos corrientes para varias entidades.")
+    parser.add_argument('--entidades', type=int, default=1, help="Cantidad de entidades a procesar")
+    parser.add_argument('--origen', default=None,
+                        help="Directorio con un subdirectorio de datos reales por entidad (ignora --entidades)")
+    parser.add_argument('--salida', default='informes', help="Directorio donde se escriben los informes")
+    parser.add_argument('--procesos', type=int, default=os.cpu_count(),
+                        help="Procesos en paralelo (1 = sin pool)")
+    parser.add_argument('--informes', default='pdf,excel,normas',
+                        help="Informes a generar, separados por coma: pdf, excel, normas")
+    parser.add_argument('--anexos', action='store_true',
+                        help="Agrega al informe con normas los anexos de facturas vencidas, anomalías y duplicados")
+    parser.add_argument('--semilla-base', type=int, default=42)
+    parser.add_argument('--fecha-referencia', type=datetime.fromisoformat, default=None,
+                        help="Fecha de corte AAAA-MM-DD (por defecto, hoy)")
+    parser.add_argument('--num-cuentas', type=int, default=50)
+    parser.add_argument('--num-prestamos', type=int, default=50)
+    parser.add_argument('--num-empleados', type=int, default=100)
+    parser.add_argument('--num-obligaciones', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    informes = [tipo.strip() for tipo in args.informes.split(',') if tipo.strip()]
+    desconocidos = set(informes) - set(INFORMES)
+    if desconocidos:
+        parser.error(f"Informes desconocidos: {', '.join(sorted(desconocidos))}")
+    args.informes = informes
+
+    args.origenes = []
+    if args.origen:
+        args.origenes = sorted(entrada.path for entrada in os.scandir(args.origen) if entrada.is_dir())
+        if not args.origenes:
+            parser.error(f"{args.origen} no contiene subdirectorios de entidades")
+        # consolidado.xlsx tiene una fila por entidad: dos directorios con el mismo
+        # nombre y CUIT se pisarían al combinarlos
+        directorios = {}
+        for origen in args.origenes:
+            directorios.setdefault(leer_entidad(origen), []).append(os.path.basename(origen))
+        repetidas = [f"{entidad.nombre} ({entidad.cuit}): {', '.join(nombres)}"
+                     for entidad, nombres in directorios.items() if len(nombres) > 1]
+        if repetidas:
+            parser.error("Entidades repetidas en --origen:\n  " + "\n  ".join(repetidas))
+        args.entidades = len(args.origenes)
+    return args
+
+
+def main(argv=None):
+    args = _parsear_argumentos(argv)
+    opciones = {
+        'salida': args.salida,
+        'informes': args.informes,
+        'anexos': args.anexos,
+        'origenes': args.origenes,
+        'semilla_base': args.semilla_base,
+        'fecha_referencia': args.fecha_referencia,
+        'num_cuentas': args.num_cuentas,
+        'num_prestamos': args.num_prestamos,
+        'num_empleados': args.num_empleados,
+        'num_obligaciones': args.num_obligaciones
+    }
+
+    inicio = time.perf_counter()
+    resultados = []
+    for resultado in ejecutar_lote(range(1, args.entidades + 1), opciones, args.procesos):
+        resultados.append(resultado)
+        print(f"Entidad {resultado['entidad']:04d}: {len(resultado['archivos'])} informes, "
+              f"pasivos ${resultado['total_pasivos']:,.2f} ({resultado['segundos']:.2f}s)")
+
+    resultados.sort(key=lambda resultado: resultado['entidad'])
+    resumenes = {resultado['identificacion']: resultado['resumen'] for resultado in resultados}
+    os.makedirs(args.salida, exist_ok=True)
+    with open(os.path.join(args.salida, 'consolidado.xlsx'), 'wb') as archivo:
+        shutil.copyfileobj(app.crear_informe_consolidado(resumenes), archivo)
+    grupo = app.combinar_resumenes(resumenes.values())
+    print(f"Grupo: pasivos ${grupo.total:,.2f} en {len(resumenes)} entidades")
+    print(f"Listo: {args.entidades} entidades en {time.perf_counter() - inicio:.1f}s -> {args.salida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,34 +7,91 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import random
-from faker import Faker
-from datetime import datetime, timedelta
-from scipy.stats import zscore
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.ensemble import IsolationForest
+from datetime import date, datetime
 import io
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
+import contextlib
+import functools
+import hashlib
+import importlib
+import inspect
+import itertools
+import json
+import logging
+import shutil
+import sys
+import threading
+import time
+import uuid
+try:
+    import tomllib
+except ModuleNotFoundError:  # Python < 3.11
+    import tomli as tomllib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import os
+import tempfile
+from pandas.api.types import union_categoricals
 import base64
 
+# =================================================================
+# IMPORTACIÓN DIFERIDA DE LIBRERÍAS PESADAS
+# =================================================================
+
+# scikit-learn, scipy, matplotlib, seaborn, Faker, reportlab, xlsxwriter y
+# joblib suman varios segundos al arranque y la página de inicio no usa
+# ninguna. Se importan recién en la función que las necesita (reportlab en
+# los constructores de informes, sklearn en el detector, Faker en la
+# nómina); para los módulos usados como espacio de nombres en muchos
+# lugares alcanza con un ModuloDiferido.
+
+class ModuloDiferido:
+    """Representa un módulo que se importa en el primer acceso a un atributo."""
+
+    def __init__(self, nombre):
+        self._nombre = nombre
+        self._modulo = None
+
+    def __getattr__(self, atributo):
+        if self._modulo is None:
+            self._modulo = importlib.import_module(self._nombre)
+        return getattr(self._modulo, atributo)
+
+    def __repr__(self):
+        estado = 'importado' if self._modulo is not None else 'sin importar'
+        return f"<ModuloDiferido {self._nombre!r} ({estado})>"
+
+
+plt = ModuloDiferido('matplotlib.pyplot')
+sns = ModuloDiferido('seaborn')
+joblib = ModuloDiferido('joblib')
+xlsxwriter = ModuloDiferido('xlsxwriter')
+
+# Librería -> módulo raíz, para el panel de diagnóstico
+LIBRERIAS_DIFERIDAS = {
+    'scikit-learn': 'sklearn',
+    'scipy': 'scipy',
+    'matplotlib': 'matplotlib',
+    'seaborn': 'seaborn',
+    'Faker': 'faker',
+    'reportlab': 'reportlab',
+    'xlsxwriter': 'xlsxwriter',
+    'joblib': 'joblib'
+}
+
+
+def librerias_cargadas():
+    """Tabla de las librerías diferidas y si ya se importaron en este proceso."""
+    return pd.DataFrame({
+        'libreria': list(LIBRERIAS_DIFERIDAS),
+        'cargada': [modulo in sys.modules for modulo in LIBRERIAS_DIFERIDAS.values()]
+    })
+
 # =================================================================
 # CONFIGURACIÓN DE PÁGINA
 # =================================================================
-st.set_page_config(
-    page_title="Auditoría Pasivos Corrientes",
-    page_icon="💼",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
 
 # Estilos CSS personalizados
-st.markdown("""
+ESTILOS_CSS = """
 <style>
     .main-header {
         font-size: 2.5rem;
@@ -83,164 +140,2174 @@ st.markdown("""
         box-shadow: 0 4px 8px rgba(0,0,0,0.2);
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+
+def configurar_pagina():
+    """Configura la página de Streamlit.
+
+    Se invoca desde ``main()`` y no al importar, para que el módulo pueda
+    usarse sin interfaz (ver ``pasivos_cli.py``).
+    """
+    st.set_page_config(
+        page_title="Auditoría Pasivos Corrientes",
+        page_icon="💼",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+    st.markdown(ESTILOS_CSS, unsafe_allow_html=True)
+
+# =================================================================
+# INSTRUMENTACIÓN
+# =================================================================
+
+DIAGNOSTICO_ACTIVO = os.environ.get('PASIVOS_DIAGNOSTICO', '') == '1'
+logger_metricas = logging.getLogger('pasivos.metricas')
+_hilo_cache = threading.local()
+
+
+def _rss_bytes():
+    """Memoria residente actual del proceso (0 si la plataforma no la expone)."""
+    try:
+        with open('/proc/self/statm') as archivo:
+            return int(archivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+class RegistroMetricas:
+    """Acumula por etapa llamadas, tiempos, memoria y aciertos de caché.
+
+    Hay uno por proceso, compartido por todas las sesiones de Streamlit (cada
+    una corre en su propio hilo), así que las actualizaciones toman un candado.
+    Los tiempos son inclusivos: una etapa incluye a las que llama.
+    """
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self._etapas = {}
+
+    def registrar(self, evento):
+        with self._candado:
+            etapa = self._etapas.setdefault(evento['etapa'], {
+                'llamadas': 0, 'segundos': 0.0, 'segundos_max': 0.0,
+                'rss_incremento_max': 0, 'aciertos': 0, 'fallos': 0
+            })
+            etapa['llamadas'] += 1
+            etapa['segundos'] += evento['segundos']
+            etapa['segundos_max'] = max(etapa['segundos_max'], evento['segundos'])
+            etapa['rss_incremento_max'] = max(etapa['rss_incremento_max'], evento['rss_incremento_bytes'])
+            if 'cache' in evento:
+                etapa['aciertos' if evento['cache'] == 'acierto' else 'fallos'] += 1
+        logger_metricas.info(json.dumps(evento, ensure_ascii=False))
+
+    def reiniciar(self):
+        with self._candado:
+            self._etapas.clear()
+
+    def instantanea(self):
+        with self._candado:
+            return {nombre: dict(valores) for nombre, valores in self._etapas.items()}
+
+    def tabla(self):
+        """Una fila por etapa, de la más costosa a la más barata."""
+        filas = [{
+            'Etapa': nombre,
+            'Llamadas': valores['llamadas'],
+            'Segundos_Total': valores['segundos'],
+            'Segundos_Prom': valores['segundos'] / valores['llamadas'],
+            'Segundos_Max': valores['segundos_max'],
+            'RSS_Max_MB': valores['rss_incremento_max'] / 1024 ** 2,
+            'Aciertos_Cache': valores['aciertos'],
+            'Fallos_Cache': valores['fallos']
+        } for nombre, valores in self.instantanea().items()]
+        columnas = ['Etapa', 'Llamadas', 'Segundos_Total', 'Segundos_Prom', 'Segundos_Max',
+                    'RSS_Max_MB', 'Aciertos_Cache', 'Fallos_Cache']
+        return pd.DataFrame(filas, columns=columnas).sort_values('Segundos_Total', ascending=False)
+
+    def json(self):
+        return json.dumps({'rss_bytes': _rss_bytes(), 'etapas': self.instantanea()},
+                          ensure_ascii=False, indent=2)
+
+    def prometheus(self):
+        """Métricas en el formato de texto de Prometheus."""
+        etapas = self.instantanea()
+        series = [
+            ('pasivos_etapa_llamadas_total', 'counter', 'Llamadas por etapa', 'llamadas'),
+            ('pasivos_etapa_segundos_total', 'counter', 'Tiempo acumulado por etapa', 'segundos'),
+            ('pasivos_etapa_segundos_max', 'gauge', 'Llamada más lenta por etapa', 'segundos_max'),
+            ('pasivos_etapa_rss_incremento_bytes_max', 'gauge',
+             'Mayor aumento de memoria residente en una llamada', 'rss_incremento_max'),
+            ('pasivos_cache_aciertos_total', 'counter', 'Aciertos de st.cache_data', 'aciertos'),
+            ('pasivos_cache_fallos_total', 'counter', 'Fallos de st.cache_data', 'fallos')
+        ]
+        lineas = []
+        for metrica, tipo, ayuda, campo in series:
+            lineas += [f'# HELP {metrica} {ayuda}', f'# TYPE {metrica} {tipo}']
+            lineas += [f'{metrica}{{etapa="{nombre}"}} {valores[campo]}'
+                       for nombre, valores in etapas.items()]
+        lineas += ['# HELP pasivos_proceso_rss_bytes Memoria residente del proceso',
+                   '# TYPE pasivos_proceso_rss_bytes gauge',
+                   f'pasivos_proceso_rss_bytes {_rss_bytes()}']
+        return '\n'.join(lineas) + '\n'
+
+
+REGISTRO_METRICAS = RegistroMetricas()
+
+
+@contextlib.contextmanager
+def medir_etapa(nombre):
+    """Mide tiempo y memoria del bloque; el evento admite datos extra (p. ej. ``cache``)."""
+    evento = {'etapa': nombre}
+    rss_inicial = _rss_bytes()
+    inicio = time.perf_counter()
+    try:
+        yield evento
+    finally:
+        evento['segundos'] = time.perf_counter() - inicio
+        evento['rss_incremento_bytes'] = _rss_bytes() - rss_inicial
+        REGISTRO_METRICAS.registrar(evento)
+
+
+def instrumentar(func):
+    """Registra cada llamada a ``func`` como una etapa con su nombre."""
+    @functools.wraps(func)
+    def envoltorio(*args, **kwargs):
+        with medir_etapa(func.__name__):
+            return func(*args, **kwargs)
+    return envoltorio
+
+
+def cache_datos(func=None, **opciones):
+    """``st.cache_data`` instrumentado: mide cada llamada y si fue acierto o fallo de caché.
+
+    Se usa igual que ``st.cache_data`` (con o sin argumentos). El fallo se
+    detecta porque Streamlit sólo ejecuta la función cuando no tiene el valor;
+    la marca vive en el hilo y se apila para las funciones cacheadas anidadas.
+    """
+    if func is None:
+        return functools.partial(cache_datos, **opciones)
+
+    @functools.wraps(func)
+    def calcular(*args, **kwargs):
+        _hilo_cache.fallo = True
+        return func(*args, **kwargs)
+
+    cacheada = st.cache_data(**opciones)(calcular)
+
+    @functools.wraps(func)
+    def envoltorio(*args, **kwargs):
+        anterior = getattr(_hilo_cache, 'fallo', False)
+        _hilo_cache.fallo = False
+        try:
+            with medir_etapa(func.__name__) as evento:
+                resultado = cacheada(*args, **kwargs)
+                evento['cache'] = 'fallo' if _hilo_cache.fallo else 'acierto'
+        finally:
+            _hilo_cache.fallo = anterior
+        return resultado
+
+    envoltorio.clear = cacheada.clear
+    return envoltorio
+
+
+# =================================================================
+# CACHÉ PERSISTENTE EN DISCO
+# =================================================================
+
+DIRECTORIO_DATOS = os.environ.get(
+    'PASIVOS_DIRECTORIO_DATOS', os.path.join(tempfile.gettempdir(), 'pasivos_corrientes'))
+DIRECTORIO_CACHE_PARQUET = os.path.join(DIRECTORIO_DATOS, 'cache')
+LIMITE_CACHE_PARQUET_BYTES = int(os.environ.get('PASIVOS_LIMITE_CACHE_MB', '1024')) * 1024 ** 2
+VERSION_DATOS = 6
+
+
+def _clave_cache_parquet(func, args, kwargs):
+    """Clave estable a partir del nombre, los parámetros efectivos y ``VERSION_DATOS``.
+
+    Un ``fecha_referencia`` nulo significa "hoy", así que la clave usa la
+    fecha del día para que la instantánea no sobreviva al cambio de fecha.
+    """
+    argumentos = inspect.signature(func).bind(*args, **kwargs)
+    argumentos.apply_defaults()
+    parametros = dict(argumentos.arguments)
+    if 'fecha_referencia' in parametros and parametros['fecha_referencia'] is None:
+        parametros['fecha_referencia'] = date.today().isoformat()
+    firma = repr((VERSION_DATOS, sorted(parametros.items(), key=lambda item: item[0])))
+    return f"{func.__name__}-{hashlib.sha256(firma.encode()).hexdigest()[:16]}"
+
+
+def _tamano_directorio(ruta):
+    return sum(entrada.stat().st_size for entrada in os.scandir(ruta) if entrada.is_file())
+
+
+def _desalojar_cache_parquet(directorio=DIRECTORIO_CACHE_PARQUET, limite=LIMITE_CACHE_PARQUET_BYTES):
+    """Elimina las instantáneas usadas hace más tiempo hasta quedar bajo ``limite`` bytes."""
+    entradas = [(entrada.stat().st_mtime, _tamano_directorio(entrada.path), entrada.path)
+                for entrada in os.scandir(directorio) if entrada.is_dir() and not entrada.name.startswith('.')]
+    total = sum(tamano for _, tamano, _ in entradas)
+    for _, tamano, ruta in sorted(entradas):
+        if total <= limite:
+            break
+        shutil.rmtree(ruta, ignore_errors=True)
+        total -= tamano
+
+
+def _leer_cache_parquet(ruta):
+    archivos = sorted(nombre for nombre in os.listdir(ruta) if nombre.endswith('.parquet'))
+    if archivos == ['__df__.parquet']:
+        resultado = pd.read_parquet(os.path.join(ruta, '__df__.parquet'))
+    else:
+        # Los archivos llevan el prefijo "NN-" para conservar el orden de las claves
+        resultado = {nombre[3:-len('.parquet')]: pd.read_parquet(os.path.join(ruta, nombre))
+                     for nombre in archivos}
+    os.utime(ruta)
+    return resultado
+
+
+def _escribir_cache_parquet(ruta, resultado):
+    """Escribe en un directorio temporal y lo renombra, para no dejar instantáneas a medias."""
+    temporal = tempfile.mkdtemp(prefix='.', dir=os.path.dirname(ruta))
+    try:
+        if isinstance(resultado, dict):
+            tablas = {f'{i:02d}-{nombre}': df for i, (nombre, df) in enumerate(resultado.items())}
+        else:
+            tablas = {'__df__': resultado}
+        for nombre, df in tablas.items():
+            df.to_parquet(os.path.join(temporal, f'{nombre}.parquet'), index=False)
+        os.replace(temporal, ruta)
+    except (ImportError, OSError):
+        shutil.rmtree(temporal, ignore_errors=True)
+        raise
+
+
+def cache_parquet(func):
+    """Persiste en Parquet el resultado de un generador de datos.
+
+    Las instantáneas se guardan en ``DIRECTORIO_CACHE_PARQUET`` con la clave
+    de ``_clave_cache_parquet`` y se desalojan por antigüedad de uso cuando
+    superan ``LIMITE_CACHE_PARQUET_BYTES``. Así un proceso nuevo lee del disco
+    en lugar de regenerar. Si falta ``pyarrow`` o el disco falla, simplemente
+    se calcula el resultado como siempre.
+    """
+    @functools.wraps(func)
+    def envoltorio(*args, **kwargs):
+        if LIMITE_CACHE_PARQUET_BYTES <= 0:
+            return func(*args, **kwargs)
+
+        ruta = os.path.join(DIRECTORIO_CACHE_PARQUET, _clave_cache_parquet(func, args, kwargs))
+        if os.path.isdir(ruta):
+            try:
+                with medir_etapa('parquet_lectura'):
+                    return _leer_cache_parquet(ruta)
+            except (ImportError, OSError, ValueError):
+                shutil.rmtree(ruta, ignore_errors=True)
+
+        resultado = func(*args, **kwargs)
+        try:
+            os.makedirs(DIRECTORIO_CACHE_PARQUET, exist_ok=True)
+            with medir_etapa('parquet_escritura'):
+                _escribir_cache_parquet(ruta, resultado)
+            _desalojar_cache_parquet()
+        except (ImportError, OSError):
+            pass
+        return resultado
+
+    return envoltorio
+
+
+# =================================================================
+# FUNCIONES DE GENERACIÓN DE DATOS
+# =================================================================
+
+TAMANO_POOL_NOMBRES = 2000
+DIRECTORIO_MODELOS = os.path.join(DIRECTORIO_DATOS, 'modelos')
+MAX_MODELOS_ANOMALIAS = 32
+MAX_MUESTRAS_AJUSTE = 100_000
+TAMANO_LOTE_PUNTUACION = 250_000
+
+
+def _numeros_id(inicio, num_registros):
+    """Números correlativos para IDs compactos y el ancho con el que se muestran."""
+    ultimo = max(inicio + num_registros - 1, 0)
+    dtype = np.int32 if ultimo < 2 ** 31 else np.int64
+    return np.arange(inicio, inicio + num_registros, dtype=dtype), max(4, len(str(ultimo)))
+
+
+def _formatear_ids(prefijo, numeros, ancho=4):
+    """Construye IDs con formato '<prefijo><número con ceros>' sin bucles de Python."""
+    numeros = np.asarray(numeros, dtype=np.int64)
+    potencias = 10 ** np.arange(ancho - 1, -1, -1, dtype=np.int64)
+    buffer = np.empty((len(numeros), len(prefijo) + ancho), dtype=np.uint8)
+    buffer[:, :len(prefijo)] = np.frombuffer(prefijo.encode(), dtype=np.uint8)
+    buffer[:, len(prefijo):] = (numeros[:, None] // potencias) % 10 + ord('0')
+    return buffer.view(f'S{buffer.shape[1]}').ravel().astype(str)
+
+
+def _generar_columnas(num_registros, semilla, especificacion, fecha_referencia=None):
+    """Motor columnar compartido por los generadores simulados.
+
+    ``especificacion`` asocia cada columna con una regla ``(tipo, *args)``:
+
+    - ``('id', prefijo, inicio)``: identificadores correlativos.
+    - ``('uniforme', minimo, maximo, decimales)``: importes o tasas redondeados.
+    - ``('entero', minimo, maximo)``: enteros en el rango cerrado.
+    - ``('fecha', desde, hasta)``: fechas a ``desde..hasta`` días de la referencia.
+    - ``('categoria', opciones[, pesos])``: etiquetas muestreadas por código.
+
+    Cada columna se resuelve con una sola llamada vectorizada sobre el mismo
+    generador, así que el resultado es reproducible para una semilla dada.
+    Los IDs se guardan como enteros con su formato en ``attrs['ids']``
+    (ver ``compactar_pasivos``).
+    """
+    rng = np.random.default_rng(semilla)
+    fecha_actual = np.datetime64(fecha_referencia or datetime.now(), 'ns')
+    columnas = {}
+    ids = {}
+
+    for nombre, (tipo, *args) in especificacion.items():
+        if tipo == 'id':
+            prefijo, inicio = args
+            columnas[nombre], ancho = _numeros_id(inicio, num_registros)
+            ids[nombre] = [prefijo, ancho]
+        elif tipo == 'uniforme':
+            minimo, maximo, decimales = args
+            columnas[nombre] = np.round(rng.uniform(minimo, maximo, num_registros), decimales)
+        elif tipo == 'entero':
+            minimo, maximo = args
+            columnas[nombre] = rng.integers(minimo, maximo + 1, num_registros)
+        elif tipo == 'fecha':
+            desde, hasta = args
+            columnas[nombre] = fecha_actual + rng.integers(desde, hasta + 1, num_registros) * np.timedelta64(1, 'D')
+        elif tipo == 'categoria':
+            opciones, pesos = (args + [None])[:2]
+            columnas[nombre] = pd.Categorical.from_codes(
+                rng.choice(len(opciones), size=num_registros, p=pesos), opciones)
+        else:
+            raise ValueError(f"Tipo de columna desconocido: {tipo}")
+
+    df = pd.DataFrame(columnas)
+    df.attrs['ids'] = ids
+    return df
+
+
+@cache_datos
+@cache_parquet
+def generar_cuentas_por_pagar(num_registros=50, semilla=42, fecha_referencia=None):
+    """Genera datos simulados de cuentas por pagar.
+
+    Todas las columnas se construyen con operaciones vectorizadas de NumPy
+    a partir de un único generador, de modo que la misma semilla produce
+    siempre el mismo conjunto (fijando también ``fecha_referencia``).
+    """
+    rng = np.random.default_rng(semilla)
+    fecha_actual = np.datetime64(fecha_referencia or datetime.now(), 'ns')
+    dia = np.timedelta64(1, 'D')
+
+    ids_factura, ancho_id = _numeros_id(0, num_registros)
+    proveedores = pd.Categorical.from_codes(
+        rng.integers(0, 20, num_registros), [f'Proveedor_{i}' for i in range(1, 21)])
+    montos = np.round(rng.uniform(100, 75000, num_registros), 2)
+    monedas = pd.Categorical.from_codes(
+        rng.choice(3, size=num_registros, p=[0.5, 0.4, 0.1]), ['USD', 'ARS', 'EUR'])
+    codigos_estado = rng.choice(3, size=num_registros, p=[0.65, 0.25, 0.10])
+
+    emision = fecha_actual - rng.integers(10, 731, num_registros) * dia
+    vencimiento = emision + rng.integers(5, 121, num_registros) * dia
+
+    # Vencida: vence en los últimos 180 días; Pendiente: vence en los próximos 90
+    vencida = codigos_estado == 2
+    pendiente = codigos_estado == 0
+    vencimiento = np.where(vencida, fecha_actual - rng.integers(1, 181, num_registros) * dia, vencimiento)
+    vencimiento = np.where(pendiente, fecha_actual + rng.integers(1, 91, num_registros) * dia, vencimiento)
+
+    # La emisión nunca puede ser posterior al vencimiento (en las pagadas ya se deriva de ella)
+    ajustar = (vencida | pendiente) & (emision >= vencimiento)
+    emision = np.where(ajustar, vencimiento - rng.integers(5, 61, num_registros) * dia, emision)
+
+    df = pd.DataFrame({
+        'id_factura': ids_factura,
+        'proveedor': proveedores,
+        'fecha_emision': emision,
+        'fecha_vencimiento': vencimiento,
+        'monto': montos,
+        'moneda': monedas,
+        'estado': pd.Categorical.from_codes(codigos_estado, ['Pendiente', 'Pagada', 'Vencida'])
+    })
+    df.attrs['ids'] = {'id_factura': ['INV-', ancho_id]}
+    return compactar_pasivos(df)
+
+
+def analizar_cuentas_por_pagar(df):
+    """Analiza cuentas por pagar con el detector ajustado para ``df`` (ver ``obtener_detector_anomalias``).
+
+    No modifica ``df``: devuelve un DataFrame nuevo con las columnas de
+    análisis; ``attrs['huella_detector']`` identifica el modelo usado. Los
+    días hasta el vencimiento dependen de la fecha, así que el análisis
+    cacheado vale sólo por el día.
+    """
+    return _analizar_cuentas_por_pagar(df, date.today())
+
+
+@cache_datos
+def _analizar_cuentas_por_pagar(df, fecha):
+    return puntuar_cuentas_por_pagar(df, obtener_detector_anomalias(df, fecha_actual=fecha))
+
+
+def puntuar_cuentas_por_pagar(df, detector, fecha_actual=None):
+    """Columnas de análisis de ``df`` con un ``DetectorAnomalias`` dado, sin pasar por la caché."""
+    from scipy.stats import zscore
+    fecha_actual = fecha_actual or datetime.now()
+    analizado = _columnas_analisis(df, detector.puntuar(df, fecha_actual), zscore(df['monto']), fecha_actual)
+    analizado.attrs['huella_detector'] = detector.huella
+    return analizado
+
+
+def _columnas_analisis(df, puntajes, monto_zscore, fecha_actual):
+    """Agrega a ``df`` las columnas de análisis a partir de los puntajes y z-scores ya calculados."""
+    return df.assign(
+        fecha_emision=pd.to_datetime(df['fecha_emision']),
+        fecha_vencimiento=pd.to_datetime(df['fecha_vencimiento']),
+        dias_hasta_vencimiento=lambda d: (d['fecha_vencimiento'] - fecha_actual).dt.days,
+        tramo_antiguedad=lambda d: tramos_antiguedad(-d['dias_hasta_vencimiento'].to_numpy(),
+                                                     impagas=d['estado'].isin(ESTADOS_IMPAGOS).to_numpy()),
+        monto_zscore=monto_zscore,
+        anomaly_score=puntajes,
+        is_anomaly=np.where(puntajes < 0, -1, 1)
+    )
+
+
+@cache_datos
+@cache_parquet
+def generar_prestamos(num_registros=50, semilla=42, fecha_referencia=None):
+    """Genera datos de préstamos."""
+    return compactar_pasivos(_generar_columnas(num_registros, semilla, {
+        'ID_Prestamo': ('id', 'LOAN-', 1),
+        'Fecha_Obtencion': ('fecha', -730, 0),
+        'Monto_Prestamo': ('uniforme', 10000, 500000, 2),
+        'Tasa_Interes_Anual': ('uniforme', 0.05, 0.20, 4),
+        'Plazo_Meses': ('entero', 12, 61),
+        'Estado_Pago': ('categoria', ['Activo', 'Pagado', 'Atrasado', 'Cancelado'])
+    }, fecha_referencia))
+
+
+@cache_datos
+def _pool_nombres(tamano=TAMANO_POOL_NOMBRES, semilla=123):
+    """Pre-genera un conjunto de nombres únicos con Faker para reutilizar por índice."""
+    from faker import Faker
+    fake = Faker('es_AR')
+    fake.seed_instance(semilla)
+    return sorted({fake.name() for _ in range(tamano)})
+
+
+def generar_remuneraciones(num_registros=100, semilla=123, reglas=None):
+    """Genera datos de nómina liquidados con ``reglas`` (por defecto, las del archivo de reglas).
+
+    Las reglas efectivas forman parte de la clave de ambas cachés, así que
+    al modificar el archivo de reglas la nómina se vuelve a liquidar.
+    """
+    return _generar_remuneraciones(num_registros, semilla, reglas or obtener_reglas_remuneraciones())
+
+
+@cache_datos
+@cache_parquet
+def _generar_remuneraciones(num_registros, semilla, reglas):
+    df = _generar_columnas(num_registros, semilla, {
+        'ID_Empleado': ('id', 'EMP-', 1),
+        'Nombre': ('categoria', _pool_nombres(semilla=semilla)),
+        'Departamento': ('categoria', ['Ventas', 'Marketing', 'Finanzas', 'Operaciones', 'IT', 'RRHH']),
+        'Salario_Bruto': ('uniforme', 50000, 300000, 2)
+    })
+    return compactar_pasivos(liquidar_remuneraciones(df, reglas))
+
+
+@cache_datos
+@cache_parquet
+def generar_cargas_fiscales(num_registros=50, semilla=42, fecha_referencia=None):
+    """Genera obligaciones fiscales."""
+    return compactar_pasivos(_generar_columnas(num_registros, semilla, {
+        'id_impuesto': ('id', 'IMP-', 0),
+        'tipo_impuesto': ('categoria', ['IVA', 'Ganancias', 'Ingresos Brutos', 'Aportes', 'Bienes Personales']),
+        'fecha_vencimiento': ('fecha', -90, 90),
+        'monto_ars': ('uniforme', 50000, 5000000, 2),
+        'estado_pago': ('categoria', ['Pendiente', 'Pagado', 'Vencido'])
+    }, fecha_referencia))
+
+
+def generar_datos_consolidados(num_cuentas=50, num_prestamos=50, num_empleados=100,
+                               num_obligaciones=50, semilla=None, fecha_referencia=None, origen=None):
+    """Genera todos los datos para el informe consolidado.
+
+    Sin ``semilla`` cada generador usa la suya por defecto. Con ``origen``
+    (un directorio con ``cuentas``, ``prestamos``, ``remuneraciones`` y
+    ``fiscales`` en CSV o Parquet) se cargan datos reales en lugar de simularlos.
+    """
+    if origen is not None:
+        return cargar_datos_consolidados(origen, (_huella_origen(origen), _huella_cotizaciones(),
+                                                  _huella_reglas()))
+    return _generar_datos_simulados(num_cuentas, num_prestamos, num_empleados, num_obligaciones,
+                                    semilla, fecha_referencia, _huella_cotizaciones(), _huella_reglas())
+
+
+def huella_datos_consolidados(num_cuentas=50, num_prestamos=50, num_empleados=100,
+                              num_obligaciones=50, semilla=None, fecha_referencia=None, origen=None):
+    """Huella de lo que determina ``generar_datos_consolidados`` con estos argumentos, sin generarlos.
+
+    Combina los parámetros, ``VERSION_DATOS`` y las huellas de cotizaciones,
+    reglas y, con ``origen``, de los archivos de datos reales.
+    """
+    if origen is not None:
+        entradas = ('origen', _huella_origen(origen))
+    else:
+        entradas = (num_cuentas, num_prestamos, num_empleados, num_obligaciones, semilla,
+                    fecha_referencia or date.today().isoformat())
+    firma = repr((VERSION_DATOS, entradas, _huella_cotizaciones(), _huella_reglas()))
+    return hashlib.sha256(firma.encode()).hexdigest()
+
+
+@cache_datos
+@cache_parquet
+def _generar_datos_simulados(num_cuentas, num_prestamos, num_empleados,
+                             num_obligaciones, semilla, fecha_referencia, huella_cotizaciones=None,
+                             huella_reglas=None):
+    semillas = {} if semilla is None else {'semilla': semilla}
+    cuentas = analizar_cuentas_por_pagar(
+        generar_cuentas_por_pagar(num_cuentas, fecha_referencia=fecha_referencia, **semillas))
+    return {
+        'cuentas': convertir_a_ars(cuentas, obtener_cotizaciones(fecha_referencia)),
+        'prestamos': generar_prestamos(num_prestamos, fecha_referencia=fecha_referencia, **semillas),
+        'remuneraciones': generar_remuneraciones(num_empleados, **semillas),
+        'fiscales': generar_cargas_fiscales(num_obligaciones, fecha_referencia=fecha_referencia, **semillas)
+    }
+
+
+# =================================================================
+# CARGA DE DATOS REALES
+# =================================================================
+
+TAMANO_BLOQUE_CARGA = 500_000
+EXTENSIONES_ORIGEN = ('.parquet', '.csv', '.csv.gz')
+
+# Tipo de cada columna por tabla: 'texto', 'categoria', 'fecha', 'monto'
+# (float no negativo), 'decimal', 'entero' o la lista cerrada de valores admitidos.
+ESQUEMAS = {
+    'cuentas': {
+        'id_factura': 'texto',
+        'proveedor': 'categoria',
+        'fecha_emision': 'fecha',
+        'fecha_vencimiento': 'fecha',
+        'monto': 'monto',
+        'moneda': 'categoria',
+        'estado': ['Pendiente', 'Pagada', 'Vencida']
+    },
+    'prestamos': {
+        'ID_Prestamo': 'texto',
+        'Fecha_Obtencion': 'fecha',
+        'Monto_Prestamo': 'monto',
+        'Tasa_Interes_Anual': 'decimal',
+        'Plazo_Meses': 'entero',
+        'Estado_Pago': ['Activo', 'Pagado', 'Atrasado', 'Cancelado']
+    },
+    'remuneraciones': {
+        'ID_Empleado': 'texto',
+        'Nombre': 'categoria',
+        'Departamento': 'categoria',
+        'Salario_Bruto': 'monto',
+        'Aportes_Patronales': 'monto',
+        'Salario_Neto': 'monto'
+    },
+    'fiscales': {
+        'id_impuesto': 'texto',
+        'tipo_impuesto': 'categoria',
+        'fecha_vencimiento': 'fecha',
+        'monto_ars': 'monto',
+        'estado_pago': ['Pendiente', 'Pagado', 'Vencido']
+    }
+}
+
+
+def _dtypes_lectura(esquema):
+    """dtypes explícitos para leer sin inferencia; las fechas se leen como texto y se convierten por bloque."""
+    dtypes = {}
+    for columna, tipo in esquema.items():
+        if tipo in ('texto', 'fecha'):
+            dtypes[columna] = str
+        elif tipo in ('monto', 'decimal', 'entero'):
+            dtypes[columna] = 'float64'
+        else:
+            dtypes[columna] = 'category'
+    return dtypes
+
+
+def _normalizar_bloque(bloque, esquema, desplazamiento, errores):
+    """Convierte un bloque leído a los tipos del esquema y lo valida de forma vectorizada.
+
+    Acumula en ``errores`` (regla -> [filas, primera fila, valores no
+    admitidos]) lo que falla en el bloque, contando las filas desde 0 en el
+    archivo completo, para informar todo el archivo de una vez.
+    """
+    def registrar(mascara, descripcion, valores=()):
+        cantidad = int(np.count_nonzero(mascara))
+        if cantidad:
+            error = errores.setdefault(descripcion, [0, desplazamiento + int(np.flatnonzero(mascara)[0]), []])
+            error[0] += cantidad
+            error[2].extend(valor for valor in valores if valor not in error[2])
+
+    columnas = {}
+    for columna, tipo in esquema.items():
+        serie = bloque[columna]
+        registrar(serie.isna().to_numpy(), f"'{columna}' vacía")
+
+        if tipo == 'fecha':
+            convertida = pd.to_datetime(serie, format='ISO8601', errors='coerce').astype('datetime64[ns]')
+            registrar((convertida.isna() & serie.notna()).to_numpy(), f"'{columna}' con fecha inválida")
+            serie = convertida
+        elif tipo == 'monto':
+            serie = serie.astype('float64')
+            registrar((serie < 0).to_numpy(), f"'{columna}' negativo")
+        elif tipo == 'decimal':
+            serie = serie.astype('float64')
+        elif tipo == 'entero':
+            serie = serie.astype('float64')
+            registrar((serie.notna() & (serie % 1 != 0)).to_numpy(), f"'{columna}' no entero")
+            serie = serie.fillna(0).astype('int64')
+        elif isinstance(tipo, list):
+            serie = serie.astype('category')
+            fuera_de_dominio = serie.cat.categories.difference(tipo)
+            if len(fuera_de_dominio):
+                registrar(serie.isin(fuera_de_dominio).to_numpy(),
+                          f"'{columna}' con valores no admitidos", list(fuera_de_dominio))
+            serie = serie.cat.set_categories(tipo)
+        elif tipo == 'categoria':
+            serie = serie.astype('category')
+        columnas[columna] = serie.reset_index(drop=True)
+    return pd.DataFrame(columnas)
+
+
+def _validar_errores(origen, errores):
+    """Lanza ``ValueError`` con cuántas filas fallan cada regla y la primera de ellas."""
+    if errores:
+        detalle = [f"{descripcion}{f' {valores[:5]}' if valores else ''}: {cantidad} filas (primera: {primera})"
+                   for descripcion, (cantidad, primera, valores) in errores.items()]
+        raise ValueError(f"{origen}: datos inválidos\n  - " + "\n  - ".join(detalle))
+
+
+def _concatenar_bloques(bloques, esquema):
+    """Une los bloques combinando las categorías de cada uno en lugar de volver a texto."""
+    if not bloques:
+        vacio = pd.DataFrame({columna: pd.Series(dtype=dtype) for columna, dtype in _dtypes_lectura(esquema).items()})
+        return _normalizar_bloque(vacio, esquema, 0, {})
+    if len(bloques) == 1:
+        return bloques[0]
+
+    columnas = {}
+    for columna in bloques[0].columns:
+        partes = [bloque[columna] for bloque in bloques]
+        if isinstance(partes[0].dtype, pd.CategoricalDtype):
+            columnas[columna] = union_categoricals(partes)
+        else:
+            columnas[columna] = pd.concat(partes, ignore_index=True)
+    return pd.DataFrame(columnas)
+
+
+def _leer_bloques(ruta, esquema, tamano_bloque):
+    """Itera el archivo en bloques de ``tamano_bloque`` filas con los dtypes del esquema."""
+    faltantes = []
+    if ruta.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        archivo = pq.ParquetFile(ruta)
+        faltantes = [columna for columna in esquema if columna not in archivo.schema_arrow.names]
+        if not faltantes:
+            for lote in archivo.iter_batches(batch_size=tamano_bloque, columns=list(esquema)):
+                yield lote.to_pandas()
+    else:
+        encabezado = pd.read_csv(ruta, nrows=0).columns
+        faltantes = [columna for columna in esquema if columna not in encabezado]
+        if not faltantes:
+            yield from pd.read_csv(ruta, usecols=list(esquema), dtype=_dtypes_lectura(esquema),
+                                   chunksize=tamano_bloque)
+    if faltantes:
+        raise ValueError(f"{ruta}: faltan las columnas {faltantes}")
+
+
+def cargar_tabla(ruta, tabla, tamano_bloque=TAMANO_BLOQUE_CARGA):
+    """Carga un archivo CSV o Parquet con el esquema de ``tabla`` (una clave de ``ESQUEMAS``).
+
+    La lectura es por bloques y con tipos explícitos, así que la memoria
+    pico es la del resultado final más un bloque. Se valida el archivo
+    completo antes de fallar, así el error reúne todas las filas con
+    problemas. El resultado pasa por ``compactar_pasivos``.
+    """
+    esquema = ESQUEMAS[tabla]
+    bloques = []
+    errores = {}
+    desplazamiento = 0
+    for bloque in _leer_bloques(ruta, esquema, tamano_bloque):
+        normalizado = _normalizar_bloque(bloque, esquema, desplazamiento, errores)
+        if not errores:
+            bloques.append(normalizado)
+        desplazamiento += len(bloque)
+    _validar_errores(ruta, errores)
+    return compactar_pasivos(_concatenar_bloques(bloques, esquema))
+
+
+def _archivos_origen(directorio):
+    """Ubica el archivo de cada tabla (``cuentas.parquet``, ``prestamos.csv``, ...) en ``directorio``."""
+    archivos = {}
+    for tabla in ESQUEMAS:
+        for extension in EXTENSIONES_ORIGEN:
+            ruta = os.path.join(directorio, tabla + extension)
+            if os.path.isfile(ruta):
+                archivos[tabla] = ruta
+                break
+    faltantes = [tabla for tabla in ESQUEMAS if tabla not in archivos]
+    if faltantes:
+        raise FileNotFoundError(f"{directorio}: no se encontraron archivos para {faltantes}")
+    return archivos
+
+
+def _huella_origen(directorio):
+    """Tamaño y fecha de modificación de cada archivo, para invalidar la caché si cambian."""
+    return tuple((ruta, os.stat(ruta).st_size, os.stat(ruta).st_mtime_ns)
+                 for ruta in _archivos_origen(directorio).values())
+
+
+@st.cache_resource(max_entries=4)
+def cargar_datos_consolidados(directorio, huella=None):
+    """Carga y analiza los datos reales de ``directorio``.
+
+    Se usa ``cache_resource`` para no duplicar en memoria libros de millones
+    de filas; ``huella`` (ver ``_huella_origen``, ``_huella_cotizaciones`` y
+    ``_huella_reglas``) forma parte de la clave para que un archivo
+    modificado se vuelva a leer. La nómina se liquida con las reglas
+    vigentes, igual que la simulada.
+    """
+    archivos = _archivos_origen(directorio)
+    datos = {tabla: cargar_tabla(ruta, tabla) for tabla, ruta in archivos.items()}
+    datos['remuneraciones'] = compactar_pasivos(
+        liquidar_remuneraciones(datos['remuneraciones'], obtener_reglas_remuneraciones()))
+    datos['cuentas'] = convertir_a_ars(analizar_cuentas_por_pagar(datos['cuentas']), obtener_cotizaciones())
+    return datos
+
+
+# =================================================================
+# CONVERSIÓN DE MONEDA
+# =================================================================
+
+MONEDA_BASE = 'ARS'
+RUTA_COTIZACIONES = os.environ.get(
+    'PASIVOS_COTIZACIONES', os.path.join(DIRECTORIO_DATOS, 'cotizaciones.csv'))
+
+# Sin archivo de cotizaciones se simula una serie diaria: valor en ARS al
+# inicio y deriva diaria del logaritmo (devaluación sostenida).
+INICIO_COTIZACIONES_SIMULADAS = '2020-01-01'
+COTIZACIONES_SIMULADAS = {'USD': (60.0, 0.0012), 'EUR': (67.0, 0.0012)}
+
+
+def generar_cotizaciones(hasta=None, semilla=7):
+    """Cotizaciones diarias simuladas (``fecha``, ``moneda``, ``tasa`` en ARS por unidad).
+
+    La serie arranca siempre en ``INICIO_COTIZACIONES_SIMULADAS``, así la
+    tasa de un día no depende de hasta cuándo se genere.
+    """
+    fechas = pd.date_range(INICIO_COTIZACIONES_SIMULADAS, pd.Timestamp(hasta or date.today()), freq='D')
+    rng = np.random.default_rng(semilla)
+    tablas = []
+    for moneda, (inicial, deriva) in COTIZACIONES_SIMULADAS.items():
+        pasos = rng.normal(deriva, 0.005, len(fechas))
+        pasos[0] = 0.0
+        tablas.append(pd.DataFrame({
+            'fecha': fechas,
+            'moneda': moneda,
+            'tasa': np.round(inicial * np.exp(np.cumsum(pasos)), 4)
+        }))
+    return pd.concat(tablas, ignore_index=True)
+
+
+def _huella_cotizaciones(ruta=RUTA_COTIZACIONES):
+    """Tamaño y fecha de modificación del archivo de cotizaciones, o ``None`` si se simulan."""
+    if not os.path.isfile(ruta):
+        return None
+    estado = os.stat(ruta)
+    return ruta, estado.st_size, estado.st_mtime_ns
+
+
+@cache_datos
+def cargar_cotizaciones(ruta=RUTA_COTIZACIONES, huella=None, hasta=None):
+    """Tabla de cotizaciones ordenada por fecha.
+
+    Se lee de ``ruta`` (CSV o Parquet con columnas ``fecha``, ``moneda`` y
+    ``tasa``) o, si el archivo no existe, se simula hasta ``hasta``.
+    ``huella`` (ver ``_huella_cotizaciones``) sólo forma parte de la clave
+    de caché.
+    """
+    if not os.path.isfile(ruta):
+        tabla = generar_cotizaciones(hasta)
+    elif ruta.endswith('.parquet'):
+        tabla = pd.read_parquet(ruta)
+    else:
+        tabla = pd.read_csv(ruta)
+
+    faltantes = [columna for columna in ('fecha', 'moneda', 'tasa') if columna not in tabla]
+    if faltantes:
+        raise ValueError(f"{ruta}: faltan las columnas {faltantes}")
+    tabla = pd.DataFrame({
+        'fecha': pd.to_datetime(tabla['fecha']).astype('datetime64[ns]'),
+        'moneda': tabla['moneda'].astype(str).str.strip().str.upper(),
+        'tasa': pd.to_numeric(tabla['tasa'], errors='coerce')
+    })
+    invalidas = tabla['fecha'].isna() | ~(tabla['tasa'] > 0)
+    if invalidas.any():
+        raise ValueError(f"{ruta}: {int(invalidas.sum())} cotizaciones sin fecha o con tasa no positiva")
+    return tabla.sort_values('fecha', kind='stable', ignore_index=True)
+
+
+def obtener_cotizaciones(hasta=None):
+    """Cotizaciones vigentes: las de ``RUTA_COTIZACIONES`` o las simuladas."""
+    return cargar_cotizaciones(RUTA_COTIZACIONES, _huella_cotizaciones(), hasta or date.today())
+
+
+@cache_datos
+def convertir_a_ars(df, cotizaciones, columna_fecha='fecha_emision', columna_monto='monto',
+                    columna_moneda='moneda'):
+    """Agrega ``monto_ars``: cada monto convertido con la última cotización de su moneda a su fecha.
+
+    Es un solo ``merge_asof`` (por moneda) entre las fechas ordenadas y la
+    tabla de cotizaciones; los montos en ARS quedan igual. Falla si alguna
+    fila en moneda extranjera no tiene una cotización previa a su fecha.
+    """
+    monedas = df[columna_moneda].astype('category')
+    categorias = monedas.cat.categories.astype(str).str.upper()
+    codigos = monedas.cat.codes.to_numpy().astype(np.int16)
+    fechas = pd.to_datetime(df[columna_fecha]).to_numpy().astype('datetime64[ns]')
+
+    tasas_tabla = cotizaciones.assign(
+        fecha=cotizaciones['fecha'].astype('datetime64[ns]'),
+        codigo=categorias.get_indexer(cotizaciones['moneda']).astype(np.int16))
+    tasas_tabla = tasas_tabla.loc[tasas_tabla['codigo'] >= 0, ['fecha', 'codigo', 'tasa']]
+
+    orden = np.argsort(fechas, kind='stable')
+    combinado = pd.merge_asof(
+        pd.DataFrame({'fecha': fechas[orden], 'codigo': codigos[orden]}),
+        tasas_tabla, on='fecha', by='codigo', direction='backward')
+    tasas = np.empty(len(df), dtype=np.float64)
+    tasas[orden] = combinado['tasa'].to_numpy()
+
+    if MONEDA_BASE in categorias:
+        tasas[codigos == categorias.get_loc(MONEDA_BASE)] = 1.0
+    sin_tasa = np.isnan(tasas)
+    if sin_tasa.any():
+        sin_cotizacion = sorted({categorias[codigo] if codigo >= 0 else '(vacía)'
+                                 for codigo in np.unique(codigos[sin_tasa])})
+        raise ValueError(f"{int(sin_tasa.sum())} filas sin cotización previa a su fecha "
+                         f"({', '.join(sin_cotizacion)})")
+
+    return df.assign(monto_ars=np.round(_montos_float64(df[columna_monto]) * tasas, 2))
+
+
+# =================================================================
+# LIQUIDACIÓN DE REMUNERACIONES
+# =================================================================
+
+RUTA_REGLAS_REMUNERACIONES = os.environ.get(
+    'PASIVOS_REGLAS_REMUNERACIONES',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reglas_remuneraciones.toml'))
+GRUPOS_CARGAS = {'retenciones': 'Retencion', 'contribuciones': 'Contribucion'}
+
+
+def _huella_reglas(ruta=RUTA_REGLAS_REMUNERACIONES):
+    """Tamaño y fecha de modificación del archivo de reglas (``None`` si no existe)."""
+    if not os.path.isfile(ruta):
+        return None
+    estado = os.stat(ruta)
+    return ruta, estado.st_size, estado.st_mtime_ns
+
+
+def _combinar_reglas(base, cambios):
+    """Copia de ``base`` con ``cambios`` aplicados recursivamente."""
+    combinadas = dict(base)
+    for clave, valor in cambios.items():
+        if isinstance(valor, dict) and isinstance(combinadas.get(clave), dict):
+            valor = _combinar_reglas(combinadas[clave], valor)
+        combinadas[clave] = valor
+    return combinadas
+
+
+@cache_datos
+def cargar_reglas_remuneraciones(ruta=RUTA_REGLAS_REMUNERACIONES, huella=None):
+    """Lee y valida el archivo TOML de reglas; ``huella`` sólo forma parte de la clave de caché."""
+    with open(ruta, 'rb') as archivo:
+        reglas = tomllib.load(archivo)
+    for nombre, categoria in [(None, {}), *reglas.get('categorias', {}).items()]:
+        efectivas = _combinar_reglas(reglas, categoria)
+        for grupo in GRUPOS_CARGAS:
+            for concepto, regla in efectivas.get(grupo, {}).items():
+                if not 0 <= regla.get('tasa', -1) <= 1:
+                    donde = f" (categoría {nombre})" if nombre else ""
+                    raise ValueError(f"{ruta}: {grupo}.{concepto}{donde} necesita una tasa entre 0 y 1")
+    return reglas
+
+
+def obtener_reglas_remuneraciones():
+    """Reglas vigentes de ``RUTA_REGLAS_REMUNERACIONES``."""
+    return cargar_reglas_remuneraciones(RUTA_REGLAS_REMUNERACIONES, _huella_reglas())
+
+
+def _nombre_concepto(prefijo, concepto):
+    return '_'.join([prefijo, *(parte.capitalize() for parte in concepto.split('_'))])
+
+
+@cache_datos
+def liquidar_remuneraciones(df, reglas):
+    """Cargas sociales y provisiones de toda la nómina con operaciones por columna.
+
+    Las reglas de cada categoría (ver ``reglas_remuneraciones.toml``) se
+    arman una vez como vectores de tasas, topes y detracciones; cada
+    empleado toma las suyas indexando con el código de su categoría, y el
+    cálculo queda en unas pocas operaciones de NumPy sobre toda la columna.
+    Agrega un monto por concepto, los totales, el SAC y las vacaciones
+    devengadas del mes (con sus contribuciones) y ``Pasivo_Total``.
+    """
+    categorias = df[reglas.get('columna_categoria', 'Departamento')].astype('category')
+    # El código -1 (sin categoría) toma la última posición: las reglas generales
+    efectivas = [_combinar_reglas(reglas, reglas.get('categorias', {}).get(str(categoria), {}))
+                 for categoria in categorias.cat.categories] + [reglas]
+    codigos = categorias.cat.codes.to_numpy()
+    bruto = _montos_float64(df['Salario_Bruto'])
+
+    def vector(valor):
+        return np.array([valor(regla) for regla in efectivas], dtype=np.float64)[codigos]
+
+    columnas = {}
+    totales = {}
+    for grupo, prefijo in GRUPOS_CARGAS.items():
+        totales[grupo] = np.zeros(len(df))
+        conceptos = dict.fromkeys(concepto for regla in efectivas for concepto in regla.get(grupo, {}))
+        for concepto in conceptos:
+            tasa = vector(lambda regla: regla.get(grupo, {}).get(concepto, {}).get('tasa', 0.0))
+            tope = vector(lambda regla: regla.get(grupo, {}).get(concepto, {}).get('tope', np.inf))
+            detraccion = vector(lambda regla: regla.get(grupo, {}).get(concepto, {}).get('detraccion', 0.0))
+            monto = np.round(np.clip(bruto - detraccion, 0.0, tope) * tasa, 2)
+            columnas[_nombre_concepto(prefijo, concepto)] = monto
+            totales[grupo] += monto
+
+    tasa_contribuciones = vector(lambda regla: sum(concepto.get('tasa', 0.0)
+                                                   for concepto in regla.get('contribuciones', {}).values()))
+    sac = np.round(bruto / 12, 2)
+    vacaciones = np.round(bruto / vector(lambda regla: regla.get('divisor_vacaciones', 25))
+                          * vector(lambda regla: regla.get('dias_vacaciones', 14)) / 12, 2)
+    cargas_provisiones = np.round((sac + vacaciones) * tasa_contribuciones, 2)
+
+    return df.assign(
+        **columnas,
+        Retenciones=np.round(totales['retenciones'], 2),
+        Aportes_Patronales=np.round(totales['contribuciones'], 2),
+        Salario_Neto=np.round(bruto - totales['retenciones'], 2),
+        SAC_Devengado=sac,
+        Vacaciones_Devengadas=vacaciones,
+        Cargas_Sobre_Provisiones=cargas_provisiones,
+        Pasivo_Total=np.round(bruto + totales['contribuciones'] + sac + vacaciones + cargas_provisiones, 2)
+    )
+
+
+# =================================================================
+# COMPACTACIÓN DE MEMORIA
+# =================================================================
+
+FRACCION_MAX_CATEGORIA = 0.5
+
+
+def _columnas_esquema(tipo):
+    return {columna for esquema in ESQUEMAS.values() for columna, t in esquema.items() if t == tipo}
+
+
+def _codificar_ids(serie):
+    """Separa IDs de la forma '<prefijo><dígitos>' de ancho fijo en prefijo, ancho y números.
+
+    Devuelve ``None`` si algún valor no respeta el formato del primero, para
+    no perder información al compactar.
+    """
+    if serie.empty or serie.isna().any():
+        return None
+    primero = str(serie.iloc[0])
+    digitos = len(primero) - len(primero.rstrip('0123456789'))
+    prefijo, ancho = primero[:len(primero) - digitos], digitos
+    if not ancho:
+        return None
+
+    textos = serie.astype(str)
+    sufijos = textos.str.slice(len(prefijo))
+    if not (textos.str.startswith(prefijo).all() and (textos.str.len() == len(primero)).all()
+            and sufijos.str.isdigit().all()):
+        return None
+    numeros = sufijos.astype('int64').to_numpy()
+    dtype = np.int32 if numeros.max() < 2 ** 31 else np.int64
+    return prefijo, ancho, numeros.astype(dtype)
+
+
+def _reducible_a_float32(valores):
+    """Un monto se puede guardar en float32 si todos los valores vuelven idénticos al redondear a centavos."""
+    return bool(np.array_equal(np.round(valores.astype(np.float32).astype(np.float64), 2), valores))
+
+
+def compactar_pasivos(df):
+    """Devuelve una versión de ``df`` que ocupa menos memoria.
+
+    - Los IDs (``'<prefijo><número>'``) pasan a enteros; el prefijo y el
+      ancho quedan en ``df.attrs['ids']`` y ``expandir_pasivos`` los reconstruye.
+    - Las columnas de texto con pocos valores distintos pasan a ``category``,
+      así los filtros por estado comparan códigos.
+    - Los montos pasan a ``float32`` sólo si cada valor vuelve exacto al
+      redondear a centavos; los totales se acumulan en float64 sobre los
+      valores redondeados (ver ``_montos_float64``).
+
+    En ``df.attrs`` quedan ``bytes_originales`` y ``bytes_compactados``.
+    """
+    columnas_id = _columnas_esquema('texto')
+    columnas_monto = _columnas_esquema('monto')
+    ids = dict(df.attrs.get('ids', {}))
+    columnas = {}
+
+    for columna in df.columns:
+        serie = df[columna]
+        if columna in columnas_id and columna not in ids and (
+                pd.api.types.is_string_dtype(serie) or pd.api.types.is_object_dtype(serie)):
+            codificado = _codificar_ids(serie)
+            if codificado is not None:
+                prefijo, ancho, numeros = codificado
+                ids[columna] = [prefijo, ancho]
+                serie = pd.Series(numeros, index=serie.index)
+        elif pd.api.types.is_string_dtype(serie) or pd.api.types.is_object_dtype(serie):
+            if serie.nunique() <= FRACCION_MAX_CATEGORIA * len(serie):
+                serie = serie.astype('category')
+        elif columna in columnas_monto and serie.dtype == np.float64 and _reducible_a_float32(serie.to_numpy()):
+            serie = serie.astype(np.float32)
+        columnas[columna] = serie
+
+    compacto = pd.DataFrame(columnas, index=df.index)
+    compacto.attrs = {
+        **df.attrs,
+        'ids': ids,
+        'bytes_originales': df.attrs.get('bytes_originales', int(df.memory_usage(deep=True).sum())),
+        'bytes_compactados': int(compacto.memory_usage(deep=True).sum())
+    }
+    return compacto
+
+
+def _montos_float64(serie):
+    """Montos en float64; los guardados en float32 se redondean otra vez a centavos."""
+    valores = serie.to_numpy()
+    if valores.dtype == np.float32:
+        return np.round(valores.astype(np.float64), 2)
+    return valores
+
+
+def _sumar(serie):
+    """Suma acumulando en float64, aunque la columna esté en float32."""
+    return float(np.sum(_montos_float64(serie)))
+
+
+def expandir_pasivos(df):
+    """Revierte ``compactar_pasivos`` para mostrar o exportar.
+
+    Los IDs vuelven a texto y los montos en float32 a float64 con centavos
+    exactos; las categorías se mantienen.
+    """
+    ids = {columna: formato for columna, formato in df.attrs.get('ids', {}).items() if columna in df}
+    montos = [columna for columna in _columnas_esquema('monto') if columna in df and df[columna].dtype == np.float32]
+    if not ids and not montos:
+        return df
+
+    columnas = {columna: _formatear_ids(prefijo, df[columna].to_numpy(), ancho)
+                for columna, (prefijo, ancho) in ids.items()}
+    columnas.update({columna: _montos_float64(df[columna]) for columna in montos})
+    expandido = df.assign(**columnas)
+    expandido.attrs = {**df.attrs, 'ids': {}}
+    return expandido
+
+
+def reporte_memoria(datos):
+    """Bytes de cada tabla de ``datos`` antes y después de compactar, y los actuales.
+
+    Los actuales pueden superar a los compactados si después se agregaron
+    columnas (por ejemplo, las del análisis de cuentas por pagar).
+    """
+    filas = []
+    for tabla, df in datos.items():
+        actuales = int(df.memory_usage(deep=True).sum())
+        originales = df.attrs.get('bytes_originales', actuales)
+        compactados = df.attrs.get('bytes_compactados', actuales)
+        filas.append({
+            'Tabla': tabla,
+            'Filas': len(df),
+            'Bytes_Originales': originales,
+            'Bytes_Compactados': compactados,
+            'Bytes_Actuales': actuales,
+            'Ahorro_%': (1 - compactados / originales) * 100 if originales else 0.0
+        })
+    return pd.DataFrame(filas)
+
+
+# =================================================================
+# DETECCIÓN DE ANOMALÍAS
+# =================================================================
+
+class DetectorAnomalias:
+    """IsolationForest que se ajusta una vez, se guarda en disco y puntúa por lotes.
+
+    El ajuste usa como máximo ``max_muestras_ajuste`` facturas elegidas al azar
+    y reparte los árboles entre todos los núcleos (``n_jobs=-1``). La
+    puntuación trabaja sobre arrays de NumPy extraídos columna a columna, sin
+    copiar el DataFrame de entrada. ``huella`` identifica los datos con los
+    que se ajustó, si se obtuvo con ``obtener_detector_anomalias``.
+    """
+
+    VERSION = 2
+    CARACTERISTICAS = ('monto', 'dias_hasta_vencimiento', 'plazo_dias')
+    COLUMNAS = ('monto', 'fecha_emision', 'fecha_vencimiento')
+
+    def __init__(self, contaminacion=0.1, max_muestras_ajuste=MAX_MUESTRAS_AJUSTE,
+                 semilla=42, n_jobs=-1):
+        self.max_muestras_ajuste = max_muestras_ajuste
+        self.semilla = semilla
+        self.huella = None
+        from sklearn.ensemble import IsolationForest
+        self.modelo = IsolationForest(random_state=semilla, contamination=contaminacion, n_jobs=n_jobs)
+
+    @staticmethod
+    def huella_entrenamiento(df, fecha_actual=None):
+        """Huella de las columnas de ``df`` de las que salen las características y del día de referencia.
+
+        ``dias_hasta_vencimiento`` se mide desde ``fecha_actual``, así que los
+        mismos datos dan otro modelo cada día.
+        """
+        dia = pd.Timestamp(fecha_actual or date.today()).date().isoformat()
+        firma = f"{huella_tabla(df[list(DetectorAnomalias.COLUMNAS)])}:{dia}"
+        return hashlib.sha256(firma.encode()).hexdigest()[:16]
+
+    @staticmethod
+    def caracteristicas(df, fecha_actual=None):
+        """Matriz ``float32`` de características de cada factura."""
+        fecha_actual = np.datetime64(fecha_actual or datetime.now(), 'ns')
+        emision = pd.to_datetime(df['fecha_emision']).to_numpy()
+        vencimiento = pd.to_datetime(df['fecha_vencimiento']).to_numpy()
+        dia = np.timedelta64(1, 'D')
+
+        matriz = np.empty((len(df), len(DetectorAnomalias.CARACTERISTICAS)), dtype=np.float32)
+        matriz[:, 0] = df['monto'].to_numpy()
+        matriz[:, 1] = (vencimiento - fecha_actual) // dia
+        matriz[:, 2] = (vencimiento - emision) // dia
+        return np.nan_to_num(matriz, copy=False)
+
+    def ajustar(self, df, fecha_actual=None):
+        """Ajusta el modelo, submuestreando si hay más filas que ``max_muestras_ajuste``."""
+        if len(df) > self.max_muestras_ajuste:
+            rng = np.random.default_rng(self.semilla)
+            indices = np.sort(rng.choice(len(df), self.max_muestras_ajuste, replace=False))
+            df = df.iloc[indices]
+        with medir_etapa('ajuste_isolation_forest'):
+            self.modelo.fit(self.caracteristicas(df, fecha_actual))
+        return self
+
+    def puntuar(self, df, fecha_actual=None, tamano_lote=TAMANO_LOTE_PUNTUACION):
+        """Devuelve el ``decision_function`` de cada fila; los valores negativos son anomalías."""
+        puntajes = np.empty(len(df), dtype=np.float64)
+        with medir_etapa('puntuacion_anomalias'):
+            for inicio in range(0, len(df), tamano_lote):
+                lote = df.iloc[inicio:inicio + tamano_lote]
+                puntajes[inicio:inicio + len(lote)] = self.modelo.decision_function(
+                    self.caracteristicas(lote, fecha_actual))
+        return puntajes
+
+    def predecir(self, df, fecha_actual=None):
+        """Etiquetas con la convención de IsolationForest: -1 anomalía, 1 normal."""
+        return np.where(self.puntuar(df, fecha_actual) < 0, -1, 1)
+
+    def guardar(self, ruta):
+        """Guarda el detector; escribe a un temporal y renombra para que otros procesos no lean un archivo a medias."""
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        temporal = f'{ruta}.{os.getpid()}.tmp'
+        joblib.dump({'version': self.VERSION, 'caracteristicas': self.CARACTERISTICAS, 'detector': self}, temporal)
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta):
+        """Carga un detector guardado; falla si fue entrenado con otras características."""
+        contenido = joblib.load(ruta)
+        if contenido.get('version') != cls.VERSION or tuple(contenido.get('caracteristicas', ())) != cls.CARACTERISTICAS:
+            raise ValueError(f"El modelo en {ruta} no es compatible con esta versión")
+        return contenido['detector']
+
+
+def _ruta_modelo(huella, directorio=DIRECTORIO_MODELOS):
+    return os.path.join(directorio, f'isolation_forest-{huella}.joblib')
+
+
+def _desalojar_modelos(directorio=DIRECTORIO_MODELOS, maximo=MAX_MODELOS_ANOMALIAS):
+    """Borra los modelos usados hace más tiempo hasta dejar ``maximo``."""
+    modelos = sorted((entrada for entrada in os.scandir(directorio) if entrada.name.endswith('.joblib')),
+                     key=lambda entrada: entrada.stat().st_mtime)
+    for entrada in modelos[:max(len(modelos) - maximo, 0)]:
+        with contextlib.suppress(OSError):
+            os.remove(entrada.path)
+
+
+@st.cache_resource(max_entries=8)
+def _detector_persistido(_df_entrenamiento, huella, directorio, fecha_actual):
+    ruta = _ruta_modelo(huella, directorio)
+    if os.path.exists(ruta):
+        try:
+            detector = DetectorAnomalias.cargar(ruta)
+            os.utime(ruta)
+            return detector
+        except (ValueError, EOFError, AttributeError):
+            pass
+    if _df_entrenamiento is None:
+        raise FileNotFoundError(f"No hay un modelo de anomalías guardado en {ruta}")
+    detector = DetectorAnomalias().ajustar(_df_entrenamiento, fecha_actual)
+    detector.huella = huella
+    detector.guardar(ruta)
+    _desalojar_modelos(directorio)
+    return detector
+
+
+def obtener_detector_anomalias(df_entrenamiento=None, huella=None, directorio=DIRECTORIO_MODELOS,
+                               fecha_actual=None):
+    """Detector ajustado con ``df_entrenamiento`` a ``fecha_actual``, persistido en ``directorio`` bajo su huella.
+
+    Cada conjunto de datos y día tiene su propio modelo: la huella de sus
+    columnas de entrada y de la fecha (ver
+    ``DetectorAnomalias.huella_entrenamiento``) nombra el archivo, así que
+    sólo se ajusta la primera vez que se ven esos datos ese día y nunca se
+    reutiliza un modelo entrenado con otros. Con ``huella`` y sin
+    datos devuelve el modelo ya guardado, o ``FileNotFoundError`` si no está.
+    Se conservan los ``MAX_MODELOS_ANOMALIAS`` usados más recientemente.
+    """
+    fecha_actual = pd.Timestamp(fecha_actual or date.today()).normalize()
+    huella = huella or DetectorAnomalias.huella_entrenamiento(df_entrenamiento, fecha_actual)
+    return _detector_persistido(df_entrenamiento, huella, directorio, fecha_actual)
+
+
+# =================================================================
+# AGREGACIÓN DE PASIVOS
+# =================================================================
+
+@dataclass(frozen=True)
+class RubroPasivo:
+    """Cantidad, saldo y participación de un rubro en el total de pasivos."""
+    cantidad: int
+    monto: float
+    porcentaje: float
+
+
+@dataclass(frozen=True)
+class ResumenPasivos:
+    """Agregados que consumen los informes y el dashboard."""
+    cuentas: RubroPasivo
+    prestamos: RubroPasivo
+    remuneraciones: RubroPasivo
+    fiscales: RubroPasivo
+    total: float
+    facturas_vencidas: int
+    anomalias: int
+
+    @property
+    def rubros(self):
+        return (self.cuentas, self.prestamos, self.remuneraciones, self.fiscales)
+
+
+@dataclass(frozen=True)
+class Entidad:
+    """Ente auditado que identifica cada informe."""
+    nombre: str
+    cuit: str = 'No informado'
+
+
+ENTIDAD_EJEMPLO = Entidad('EMPRESA EJEMPLO S.A.', '30-12345678-9')
+CATEGORIAS_RUBROS = ('Cuentas por Pagar', 'Préstamos', 'Nómina', 'Cargas Fiscales')
+
+
+def _totales_por_estado(df, columna_estado, columna_monto):
+    """Cantidad y monto por estado en una sola pasada sobre los códigos de la categoría.
+
+    Los montos se acumulan en float64 aunque la columna esté en float32.
+    """
+    estados = df[columna_estado].astype('category')
+    codigos = estados.cat.codes.to_numpy()
+    montos = _montos_float64(df[columna_monto])
+    if (codigos < 0).any():
+        validos = codigos >= 0
+        codigos, montos = codigos[validos], montos[validos]
+    num_estados = len(estados.cat.categories)
+    return pd.DataFrame({
+        'size': np.bincount(codigos, minlength=num_estados),
+        'sum': np.bincount(codigos, weights=montos, minlength=num_estados)
+    }, index=estados.cat.categories)
+
+
+def _valores_estado(totales, estado):
+    if estado not in totales.index:
+        return 0, 0.0
+    return int(totales.at[estado, 'size']), float(totales.at[estado, 'sum'])
+
+
+def _valores_remuneraciones(df):
+    """Cantidad y monto de la nómina: el pasivo liquidado si está, si no el salario bruto."""
+    columna = 'Pasivo_Total' if 'Pasivo_Total' in df.columns else 'Salario_Bruto'
+    return len(df), _sumar(df[columna])
+
+
+@instrumentar
+def calcular_resumen_pasivos(datos):
+    """Calcula el ``ResumenPasivos`` recorriendo cada DataFrame una sola vez."""
+    cuentas = _totales_por_estado(datos['cuentas'], 'estado', 'monto_ars')
+    prestamos = _totales_por_estado(datos['prestamos'], 'Estado_Pago', 'Monto_Prestamo')
+    fiscales = _totales_por_estado(datos['fiscales'], 'estado_pago', 'monto_ars')
+
+    valores = [
+        _valores_estado(cuentas, 'Pendiente'),
+        _valores_estado(prestamos, 'Activo'),
+        _valores_remuneraciones(datos['remuneraciones']),
+        _valores_estado(fiscales, 'Pendiente')
+    ]
+    anomalias = 0
+    if 'is_anomaly' in datos['cuentas']:
+        anomalias = int((datos['cuentas']['is_anomaly'] == -1).sum())
+
+    return _armar_resumen(valores, _valores_estado(cuentas, 'Vencida')[0], anomalias)
+
+
+def _armar_resumen(valores, facturas_vencidas, anomalias):
+    """``ResumenPasivos`` a partir de la cantidad y el monto de cada rubro."""
+    total = sum(monto for _, monto in valores)
+    rubros = [RubroPasivo(cantidad, monto, monto / total * 100 if total else 0.0)
+              for cantidad, monto in valores]
+    return ResumenPasivos(*rubros, total=total, facturas_vencidas=facturas_vencidas, anomalias=anomalias)
+
+
+def combinar_resumenes(resumenes):
+    """``ResumenPasivos`` del grupo: suma los rubros de cada entidad y recalcula los porcentajes.
+
+    Como todos los agregados son sumas, combinar los resúmenes parciales
+    da lo mismo que resumir los datos de todas las entidades juntos.
+    """
+    resumenes = list(resumenes)
+    valores = [(sum(resumen.rubros[i].cantidad for resumen in resumenes),
+                sum(resumen.rubros[i].monto for resumen in resumenes))
+               for i in range(len(CATEGORIAS_RUBROS))]
+    return _armar_resumen(valores, sum(resumen.facturas_vencidas for resumen in resumenes),
+                          sum(resumen.anomalias for resumen in resumenes))
+
+
+def tabla_consolidada(resumenes):
+    """Una fila por entidad (``{Entidad: ResumenPasivos}``) con el monto de cada rubro, más la del grupo."""
+    filas = list(resumenes.items()) + [(Entidad('Total Grupo', ''), combinar_resumenes(resumenes.values()))]
+    return pd.DataFrame([{
+        'Entidad': entidad.nombre,
+        'CUIT': entidad.cuit,
+        **{categoria: rubro.monto for categoria, rubro in zip(CATEGORIAS_RUBROS, resumen.rubros)},
+        'Total': resumen.total,
+        'Facturas_Vencidas': resumen.facturas_vencidas,
+        'Anomalias': resumen.anomalias
+    } for entidad, resumen in filas])
+
+
+# =================================================================
+# AMORTIZACIÓN DE PRÉSTAMOS
+# =================================================================
+
+SISTEMAS_AMORTIZACION = {'frances': 'Francés', 'aleman': 'Alemán'}
+MESES_PORCION_CORRIENTE = 12
+ESTADOS_PRESTAMO_VIGENTE = ('Activo', 'Atrasado')
+
+
+def _sumar_meses(fechas, meses):
+    """Suma ``meses`` a cada fecha (``datetime64[D]``) respetando el fin de mes, con broadcasting.
+
+    Trabaja con enteros: el primer día y el largo de cada mes salen de una
+    tabla con los meses del rango, en lugar de convertir cada celda.
+    """
+    fechas = np.asarray(fechas, dtype='datetime64[D]')
+    mes_base = fechas.astype('datetime64[M]').astype(np.int64)
+    dia = fechas.astype(np.int64) - mes_base.astype('datetime64[M]').astype('datetime64[D]').astype(np.int64)
+    primero = int(mes_base.min(initial=0)) + int(np.min(meses, initial=0))
+    posicion = (mes_base - primero) + meses
+    inicios = np.arange(primero, primero + int(posicion.max(initial=0)) + 2).astype('datetime64[M]')
+    inicios = inicios.astype('datetime64[D]').astype(np.int64)
+    dias_mes = inicios[posicion + 1] - inicios[posicion]
+    return (inicios[posicion] + np.minimum(dia, dias_mes - 1)).astype('datetime64[D]')
+
+
+def _matrices_amortizacion(df, sistema='frances'):
+    """Cronograma de todos los préstamos como matrices préstamo × cuota.
+
+    Francés: cuota constante; alemán: capital constante. Los saldos se
+    redondean a centavos, así el capital de las cuotas suma exactamente el
+    monto prestado. Más allá del plazo de cada préstamo todo queda en cero
+    y ``mascara`` marca las cuotas reales.
+    """
+    if sistema not in SISTEMAS_AMORTIZACION:
+        raise ValueError(f"Sistema de amortización desconocido: {sistema!r}")
+
+    principal = _montos_float64(df['Monto_Prestamo'])[:, None]
+    tasa = df['Tasa_Interes_Anual'].to_numpy(dtype=np.float64)[:, None] / 12
+    plazo = df['Plazo_Meses'].to_numpy(dtype=np.int64)[:, None]
+    cuotas = np.arange(1, max(int(plazo.max(initial=0)), 1) + 1)[None, :]
+
+    if sistema == 'frances':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_tasa = np.log1p(tasa)
+            cuota = np.where(tasa > 0, principal * tasa / -np.expm1(-plazo * log_tasa), principal / plazo)
+            factor = np.exp(cuotas * log_tasa)
+            saldo = principal * factor - cuota * (factor - 1) / tasa
+        sin_tasa = tasa[:, 0] <= 0
+        if sin_tasa.any():
+            saldo[sin_tasa] = principal[sin_tasa] - cuotas * cuota[sin_tasa]
+    else:
+        saldo = principal - cuotas * (principal / plazo)
+    np.maximum(saldo, 0.0, out=saldo)
+    np.round(saldo, 2, out=saldo)
+
+    saldo_inicial = np.empty_like(saldo)
+    saldo_inicial[:, 0] = principal[:, 0]
+    saldo_inicial[:, 1:] = saldo[:, :-1]
+    # Hay muchos menos días de obtención que préstamos: las fechas de cada
+    # cuota se calculan por día distinto y se reparten con un solo índice
+    obtencion = pd.to_datetime(df['Fecha_Obtencion']).to_numpy().astype('datetime64[D]')
+    dias, posiciones = np.unique(obtencion, return_inverse=True)
+    return {
+        'obtencion': obtencion,
+        'vencimiento': _sumar_meses(dias[:, None], cuotas)[posiciones],
+        'saldo_inicial': saldo_inicial,
+        'capital': saldo_inicial - saldo,
+        'interes': np.round(saldo_inicial * tasa, 2),
+        'saldo': saldo,
+        'tasa': tasa[:, 0],
+        'plazo': plazo[:, 0],
+        'mascara': cuotas <= plazo
+    }
+
+
+@cache_datos
+def cronograma_prestamos(df, sistema='frances'):
+    """Cronograma en formato largo: una fila por préstamo y cuota.
+
+    ``ID_Prestamo`` se mantiene como entero (con el formato en ``attrs``,
+    como en ``compactar_pasivos``) y el número de cuota en ``int16``.
+    """
+    matrices = _matrices_amortizacion(df, sistema)
+    mascara = matrices['mascara']
+    filas, columnas = np.nonzero(mascara)
+    capital, interes = matrices['capital'][mascara], matrices['interes'][mascara]
+    cronograma = pd.DataFrame({
+        'ID_Prestamo': df['ID_Prestamo'].to_numpy()[filas],
+        'Cuota': (columnas + 1).astype(np.int16),
+        'Fecha_Vencimiento': matrices['vencimiento'][mascara].astype('datetime64[ns]'),
+        'Capital': capital,
+        'Interes': interes,
+        'Cuota_Total': np.round(capital + interes, 2),
+        'Saldo': matrices['saldo'][mascara]
+    })
+    cronograma.attrs['ids'] = {columna: formato for columna, formato in df.attrs.get('ids', {}).items()
+                               if columna == 'ID_Prestamo'}
+    return cronograma
+
+
+@cache_datos
+def clasificar_prestamos(df, fecha_corte, sistema='frances'):
+    """Saldo, intereses devengados y porción corriente/no corriente de cada préstamo a ``fecha_corte``.
+
+    La porción corriente es el capital que vence dentro de los
+    ``MESES_PORCION_CORRIENTE`` meses siguientes al corte (RT 7). Los
+    intereses devengados son los de la cuota en curso, prorrateados por días.
+    """
+    matrices = _matrices_amortizacion(df, sistema)
+    mascara, vencimiento = matrices['mascara'], matrices['vencimiento']
+    corte = np.datetime64(fecha_corte, 'D')
+    limite = _sumar_meses(corte, MESES_PORCION_CORRIENTE)
+
+    pagadas = ((vencimiento <= corte) & mascara).sum(axis=1)
+    filas = np.arange(len(df))
+    fechas = np.concatenate([matrices['obtencion'][:, None], vencimiento], axis=1)
+    saldos = np.concatenate([matrices['saldo_inicial'][:, :1], matrices['saldo']], axis=1)
+    saldo = saldos[filas, pagadas]
+
+    en_curso = pagadas < matrices['plazo']
+    siguiente = np.minimum(pagadas + 1, fechas.shape[1] - 1)
+    transcurrido = (corte - fechas[filas, pagadas]).astype(np.int64)
+    periodo = (fechas[filas, siguiente] - fechas[filas, pagadas]).astype(np.int64)
+    fraccion = np.clip(transcurrido / np.maximum(periodo, 1), 0.0, 1.0)
+    devengados = np.where(en_curso, saldo * matrices['tasa'] * fraccion, 0.0)
+
+    proximas = mascara & (vencimiento > corte) & (vencimiento <= limite)
+    corriente = np.where(proximas, matrices['capital'], 0.0).sum(axis=1)
+    primera_cuota = matrices['capital'][:, 0] + matrices['interes'][:, 0]
+
+    return pd.DataFrame({
+        'Cuotas_Vencidas': pagadas.astype(np.int16),
+        'Cuota_Inicial': np.round(primera_cuota, 2),
+        'Saldo_Capital': np.round(saldo, 2),
+        'Intereses_Devengados': np.round(devengados, 2),
+        'Porcion_Corriente': np.round(corriente, 2),
+        'Porcion_No_Corriente': np.round(saldo - corriente, 2)
+    }, index=df.index)
+
+
+# =================================================================
+# ANTIGÜEDAD DE SALDOS
+# =================================================================
+
+# Días de atraso que cierran cada tramo: hasta 0 (no vencido), 1-30, ..., más de 180
+LIMITES_ANTIGUEDAD = (0, 30, 60, 90, 180)
+ESTADOS_IMPAGOS = ('Pendiente', 'Vencida')
+HORIZONTE_PROYECCION_DIAS = 120
+
+
+def etiquetas_antiguedad(limites=LIMITES_ANTIGUEDAD):
+    primera = 'No vencido' if limites[0] == 0 else f'Hasta {limites[0]}'
+    intermedias = [f'{desde + 1}-{hasta}' for desde, hasta in zip(limites, limites[1:])]
+    return [primera, *intermedias, f'+{limites[-1]}']
+
+
+def tramos_antiguedad(dias_vencido, limites=LIMITES_ANTIGUEDAD, impagas=None):
+    """Tramo de cada factura según sus días de atraso, como categoría ordenada.
+
+    Con ``impagas`` sólo las facturas marcadas tienen tramo; las demás quedan nulas.
+    """
+    codigos = np.digitize(dias_vencido, limites, right=True)
+    if impagas is not None:
+        codigos = np.where(impagas, codigos, -1)
+    return pd.Categorical.from_codes(codigos, etiquetas_antiguedad(limites), ordered=True)
+
+
+class AntiguedadSaldos:
+    """Antigüedad de las facturas impagas por proveedor y proyección diaria de pagos.
+
+    Cada lote se procesa en una pasada: ``np.digitize`` asigna el tramo y
+    ``np.bincount`` acumula las celdas proveedor × tramo y los montos por
+    día de vencimiento. ``agregar`` suma lotes nuevos sobre lo acumulado,
+    así que las facturas que llegan después no obligan a recalcular todo.
+    """
+
+    def __init__(self, fecha_corte, limites=LIMITES_ANTIGUEDAD, horizonte=HORIZONTE_PROYECCION_DIAS):
+        self.fecha_corte = np.datetime64(fecha_corte, 'D')
+        self.limites = tuple(limites)
+        self.etiquetas = etiquetas_antiguedad(self.limites)
+        self.horizonte = horizonte
+        self.proveedores = pd.Index([], dtype=object)
+        self._montos = np.zeros((0, len(self.etiquetas)))
+        self._cantidades = np.zeros((0, len(self.etiquetas)), dtype=np.int64)
+        self._pagos = np.zeros(horizonte + 1)
+
+    def agregar(self, df):
+        """Suma las facturas impagas de ``df`` (en ``monto_ars`` si existe)."""
+        proveedores = df['proveedor'].astype('category')
+        nuevos = proveedores.cat.categories.difference(self.proveedores)
+        if len(nuevos):
+            self.proveedores = self.proveedores.append(pd.Index(nuevos, dtype=object))
+            relleno = ((0, len(nuevos)), (0, 0))
+            self._montos = np.pad(self._montos, relleno)
+            self._cantidades = np.pad(self._cantidades, relleno)
+
+        codigos = proveedores.cat.codes.to_numpy()
+        validas = df['estado'].isin(ESTADOS_IMPAGOS).to_numpy() & (codigos >= 0)
+        codigos = self.proveedores.get_indexer(proveedores.cat.categories)[codigos[validas]]
+        vencimiento = pd.to_datetime(df['fecha_vencimiento']).to_numpy().astype('datetime64[D]')[validas]
+        dias_vencido = (self.fecha_corte - vencimiento).astype(np.int64)
+        montos = _montos_float64(df['monto_ars' if 'monto_ars' in df else 'monto'])[validas]
+
+        num_tramos = len(self.etiquetas)
+        celdas = codigos * num_tramos + np.digitize(dias_vencido, self.limites, right=True)
+        forma = self._montos.shape
+        self._montos += np.bincount(celdas, weights=montos, minlength=forma[0] * forma[1]).reshape(forma)
+        self._cantidades += np.bincount(celdas, minlength=forma[0] * forma[1]).reshape(forma)
+
+        dias_hasta = -dias_vencido
+        proximas = (dias_hasta >= 0) & (dias_hasta <= self.horizonte)
+        self._pagos += np.bincount(dias_hasta[proximas], weights=montos[proximas],
+                                   minlength=self.horizonte + 1)
+        return self
+
+    def matriz(self, cantidades=False):
+        """Proveedor × tramo (montos o cantidades), de mayor a menor saldo total."""
+        valores = self._cantidades if cantidades else self._montos
+        tabla = pd.DataFrame(valores, index=pd.Index(self.proveedores, name='proveedor'),
+                             columns=self.etiquetas)
+        tabla['Total'] = tabla.sum(axis=1)
+        orden = np.argsort(-self._montos.sum(axis=1), kind='stable')
+        return tabla.iloc[orden]
+
+    def totales(self):
+        """Cantidad y monto de cada tramo para todos los proveedores."""
+        return pd.DataFrame({'Cantidad': self._cantidades.sum(axis=0), 'Monto': self._montos.sum(axis=0)},
+                            index=pd.Index(self.etiquetas, name='Tramo'))
+
+    def proyeccion(self):
+        """Pagos por día de vencimiento desde la fecha de corte, con su acumulado (sin lo ya vencido)."""
+        fechas = pd.date_range(pd.Timestamp(self.fecha_corte), periods=self.horizonte + 1, freq='D')
+        return pd.DataFrame({'Pagos': self._pagos, 'Acumulado': np.cumsum(self._pagos)},
+                            index=pd.Index(fechas, name='Fecha'))
+
+
+@cache_datos
+def analizar_antiguedad(df, fecha_corte, limites=LIMITES_ANTIGUEDAD):
+    """``AntiguedadSaldos`` de todas las facturas de ``df`` a ``fecha_corte``."""
+    return AntiguedadSaldos(fecha_corte, limites).agregar(df)
+
+
+# =================================================================
+# DUPLICADOS Y CONCENTRACIÓN DE PROVEEDORES
+# =================================================================
+
+# Facturas del mismo proveedor, moneda y monto (redondeado a múltiplos de
+# REDONDEO_DUPLICADOS) emitidas con hasta VENTANA_DUPLICADOS_DIAS de diferencia
+VENTANA_DUPLICADOS_DIAS = 30
+REDONDEO_DUPLICADOS = 1.0
+# Umbrales del índice Herfindahl-Hirschman (escala 0-10.000)
+UMBRALES_HHI = ((1500, 'Baja'), (2500, 'Moderada'), (float('inf'), 'Alta'))
+
+
+class IndiceDuplicados:
+    """Grupos de facturas candidatas a estar duplicadas.
+
+    Ordena una sola vez por (proveedor, moneda, monto redondeado, emisión)
+    con ``np.lexsort``: las facturas con la misma clave quedan contiguas y
+    por fecha, así que alcanza con comparar cada una con la anterior en
+    lugar de todos los pares. Las facturas consecutivas de una misma clave
+    separadas por hasta ``ventana`` días se encadenan en un grupo, de modo
+    que un grupo puede abarcar más de ``ventana`` días en total.
+    """
+
+    def __init__(self, df, ventana=VENTANA_DUPLICADOS_DIAS, redondeo=REDONDEO_DUPLICADOS):
+        self.df = df
+        self.ventana = ventana
+        self.redondeo = redondeo
+        proveedores = df['proveedor'].astype('category').cat.codes.to_numpy()
+        monedas = (df['moneda'].astype('category').cat.codes.to_numpy() if 'moneda' in df
+                   else np.zeros(len(df), dtype=np.int8))
+        montos = _montos_float64(df['monto']) / redondeo
+        emision = pd.to_datetime(df['fecha_emision']).to_numpy().astype('datetime64[D]')
+        validas = np.flatnonzero((proveedores >= 0) & (monedas >= 0) & np.isfinite(montos) & ~np.isnat(emision))
+
+        claves = (proveedores[validas], monedas[validas], np.round(montos[validas]).astype(np.int64))
+        dias = emision[validas].astype(np.int64)
+        orden = np.lexsort((dias, *reversed(claves)))
+        claves = [clave[orden] for clave in claves]
+        dias = dias[orden]
+
+        # enlazada[i]: la factura i + 1 del orden duplica a la i
+        enlazada = np.diff(dias) <= ventana
+        for clave in claves:
+            enlazada &= clave[1:] == clave[:-1]
+        inicia = np.ones(len(dias), dtype=bool)
+        inicia[1:] = ~enlazada
+        grupos = np.cumsum(inicia) - 1
+        tamanos = np.bincount(grupos)
+        en_grupo = tamanos[grupos] > 1
+
+        self._posiciones = validas[orden][en_grupo]
+        self._grupos = np.unique(grupos[en_grupo], return_inverse=True)[1] + 1
+        self._primeras = inicia[en_grupo]
+        self.cantidad_grupos = int(self._grupos[-1]) if len(self._grupos) else 0
+
+    def _montos(self):
+        columna = 'monto_ars' if 'monto_ars' in self.df else 'monto'
+        return _montos_float64(self.df[columna])[self._posiciones]
+
+    def total(self):
+        """Grupos, facturas involucradas y monto repetido (todas menos la primera de cada grupo)."""
+        repetido = self._montos()[~self._primeras].sum()
+        return self.cantidad_grupos, len(self._posiciones), round(float(repetido), 2)
+
+    def candidatas(self):
+        """Facturas de cada grupo, contiguas y por fecha de emisión, precedidas de su ``grupo_duplicado``."""
+        filas = self.df.iloc[self._posiciones].copy()
+        filas.insert(0, 'grupo_duplicado', self._grupos)
+        return filas
+
+    def por_proveedor(self):
+        """Grupos, facturas y monto repetido por proveedor, de mayor a menor monto repetido."""
+        proveedores = self.df['proveedor'].to_numpy()[self._posiciones]
+        tabla = pd.DataFrame({
+            'proveedor': proveedores,
+            'Grupos': self._primeras.astype(np.int64),
+            'Facturas': 1,
+            'Monto_Repetido': np.where(self._primeras, 0.0, self._montos())
+        }).groupby('proveedor', observed=True).sum()
+        return tabla.sort_values('Monto_Repetido', ascending=False, kind='stable')
+
+
+@st.cache_resource(max_entries=8)
+def detectar_duplicados(df, ventana=VENTANA_DUPLICADOS_DIAS, redondeo=REDONDEO_DUPLICADOS):
+    """``IndiceDuplicados`` de las facturas de ``df``, compartido entre sesiones sin copiar la tabla."""
+    return IndiceDuplicados(df, ventana, redondeo)
+
+
+@dataclass(frozen=True)
+class ConcentracionProveedores:
+    """Concentración del monto facturado entre proveedores."""
+    proveedores: int
+    hhi: float
+    equivalentes: float
+    principal: float
+    cinco_principales: float
+
+    @property
+    def nivel(self):
+        """'Baja', 'Moderada' o 'Alta' según ``UMBRALES_HHI``."""
+        return next(nivel for umbral, nivel in UMBRALES_HHI if self.hhi < umbral)
+
+
+def participacion_proveedores(df):
+    """Participación de cada proveedor en el monto total (``monto_ars`` si existe), de mayor a menor."""
+    proveedores = df['proveedor'].astype('category')
+    codigos = proveedores.cat.codes.to_numpy()
+    validas = codigos >= 0
+    montos = _montos_float64(df['monto_ars' if 'monto_ars' in df else 'monto'])[validas]
+    totales = np.bincount(codigos[validas], weights=montos, minlength=len(proveedores.cat.categories))
+    participacion = pd.Series(totales / totales.sum() if totales.sum() else totales,
+                              index=pd.Index(proveedores.cat.categories, name='proveedor'))
+    return participacion[participacion > 0].sort_values(ascending=False, kind='stable')
+
+
+def concentracion_proveedores(df):
+    """``ConcentracionProveedores``: HHI (0-10.000), proveedores equivalentes y participación de los principales."""
+    participacion = participacion_proveedores(df).to_numpy()
+    hhi = float(np.square(participacion).sum())
+    return ConcentracionProveedores(
+        proveedores=len(participacion),
+        hhi=round(hhi * 10_000, 1),
+        equivalentes=round(1 / hhi, 2) if hhi else 0.0,
+        principal=float(participacion[:1].sum()),
+        cinco_principales=float(participacion[:5].sum())
+    )
+
+
+# =================================================================
+# VENCIMIENTOS FISCALES
+# =================================================================
+
+ESTADOS_FISCALES_IMPAGOS = ('Pendiente', 'Vencido')
+# Separa en la clave compuesta el tipo de impuesto del día de vencimiento
+_DESPLAZAMIENTO_DIAS = 2 ** 31
+
+
+def _dia(fecha):
+    return np.datetime64(fecha, 'D').astype(np.int64)
+
+
+class CalendarioVencimientos:
+    """Índice por fecha de vencimiento de las obligaciones impagas.
+
+    Ordena una sola vez las obligaciones por (tipo, vencimiento) y por
+    vencimiento, y guarda los montos acumulados en ese orden: cada consulta
+    por rango de fechas se resuelve con ``searchsorted`` y una resta de
+    acumulados, sin recorrer la tabla, y todas las ventanas de un
+    calendario se buscan juntas en una sola llamada.
+    """
+
+    def __init__(self, df, columna_fecha='fecha_vencimiento', columna_tipo='tipo_impuesto',
+                 columna_monto='monto_ars', columna_estado='estado_pago', estados=ESTADOS_FISCALES_IMPAGOS):
+        self.df = df
+        tipos = df[columna_tipo].astype('category')
+        self.tipos = tipos.cat.categories
+        codigos = tipos.cat.codes.to_numpy()
+        impagas = np.flatnonzero(df[columna_estado].isin(estados).to_numpy() & (codigos >= 0))
+        dias = pd.to_datetime(df[columna_fecha]).to_numpy().astype('datetime64[D]').astype(np.int64)[impagas]
+        montos = _montos_float64(df[columna_monto])[impagas]
+        claves = codigos[impagas].astype(np.int64) * 2 ** 32 + (dias + _DESPLAZAMIENTO_DIAS)
+
+        orden = np.argsort(claves, kind='stable')
+        self._claves = claves[orden]
+        self._acumulado = np.concatenate(([0.0], np.cumsum(montos[orden])))
+
+        orden = np.argsort(dias, kind='stable')
+        self._posiciones = impagas[orden]
+        self._dias = dias[orden]
+        self._acumulado_dias = np.concatenate(([0.0], np.cumsum(montos[orden])))
+
+    def _limites(self, desde, hasta):
+        desde = np.iinfo(np.int32).min if desde is None else _dia(desde)
+        hasta = np.iinfo(np.int32).max if hasta is None else _dia(hasta)
+        return np.searchsorted(self._dias, [desde, hasta], 'left')
+
+    def total(self, desde=None, hasta=None):
+        """Cantidad y monto de lo que vence en [``desde``, ``hasta``)."""
+        inicio, fin = self._limites(desde, hasta)
+        return int(fin - inicio), round(float(self._acumulado_dias[fin] - self._acumulado_dias[inicio]), 2)
+
+    def obligaciones(self, desde=None, hasta=None):
+        """Filas que vencen en [``desde``, ``hasta``), por fecha de vencimiento."""
+        inicio, fin = self._limites(desde, hasta)
+        return self.df.iloc[self._posiciones[inicio:fin]]
+
+    def proximos_vencimientos(self, fecha_corte, dias):
+        """Filas que vencen desde ``fecha_corte`` hasta ``dias`` días después, inclusive."""
+        return self.obligaciones(fecha_corte, np.datetime64(fecha_corte, 'D') + dias + 1)
+
+    def _ventanas(self, inicios, ventana):
+        """Cantidades y montos tipo × ventana para las ventanas [inicio, inicio + ventana)."""
+        bases = np.arange(len(self.tipos), dtype=np.int64)[:, None] * 2 ** 32 + _DESPLAZAMIENTO_DIAS
+        desde = np.searchsorted(self._claves, bases + inicios, 'left')
+        hasta = np.searchsorted(self._claves, bases + inicios + ventana, 'left')
+        return hasta - desde, self._acumulado[hasta] - self._acumulado[desde]
+
+    def por_tipo(self, desde=None, hasta=None):
+        """Cantidad y monto por tipo de lo que vence en [``desde``, ``hasta``)."""
+        desde = -_DESPLAZAMIENTO_DIAS if desde is None else _dia(desde)
+        hasta = _DESPLAZAMIENTO_DIAS if hasta is None else _dia(hasta)
+        cantidades, montos = self._ventanas(np.array([desde]), hasta - desde)
+        return pd.DataFrame({'Cantidad': cantidades[:, 0], 'Monto': montos[:, 0]},
+                            index=pd.Index(self.tipos, name='Tipo'))
+
+    def vencidas_por_tipo(self, fecha_corte):
+        """Impagas con vencimiento anterior a ``fecha_corte``, por tipo."""
+        return self.por_tipo(hasta=fecha_corte)
+
+    def exposicion(self, desde, periodos, paso=7, ventana=7, cantidades=False):
+        """Monto (o cantidad) por tipo en ventanas de ``ventana`` días que avanzan de a ``paso``.
+
+        Con ``paso == ventana`` son semanas consecutivas; con ``paso=1`` es
+        la exposición móvil de los próximos ``ventana`` días a partir de cada
+        día, y con ``paso=ventana=1`` el calendario diario.
+        """
+        inicios = _dia(desde) + paso * np.arange(periodos, dtype=np.int64)
+        conteos, montos = self._ventanas(inicios, ventana)
+        fechas = pd.DatetimeIndex(inicios.astype('datetime64[D]'), name='Fecha')
+        return pd.DataFrame((conteos if cantidades else montos).T, index=fechas, columns=self.tipos)
+
+
+@st.cache_resource(max_entries=8)
+def calendario_fiscal(df):
+    """``CalendarioVencimientos`` compartido entre sesiones y widgets para cada tabla de obligaciones."""
+    return CalendarioVencimientos(df)
+
+
+# =================================================================
+# ANÁLISIS INCREMENTAL
+# =================================================================
+
+RUTA_ANALISIS_INCREMENTAL = os.path.join(DIRECTORIO_DATOS, 'analisis_cuentas.joblib')
+
+
+class EstadisticasIncrementales:
+    """Cantidad, media y varianza de una columna que crece por lotes.
+
+    Cada lote se resume con NumPy y se combina con lo acumulado según la
+    fórmula de Welford para lotes (Chan et al.), sin volver a leer los
+    valores anteriores. La varianza es poblacional, como ``scipy.stats.zscore``.
+    """
+
+    def __init__(self):
+        self.cantidad = 0
+        self.media = 0.0
+        self._m2 = 0.0
+
+    def agregar(self, valores):
+        valores = np.asarray(valores, dtype=np.float64)
+        if not len(valores):
+            return self
+        media_lote = valores.mean()
+        total = self.cantidad + len(valores)
+        delta = media_lote - self.media
+        self._m2 += ((valores - media_lote) ** 2).sum() + delta ** 2 * self.cantidad * len(valores) / total
+        self.media += delta * len(valores) / total
+        self.cantidad = total
+        return self
+
+    @property
+    def varianza(self):
+        return self._m2 / self.cantidad if self.cantidad else np.nan
+
+    def zscore(self, valores):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (np.asarray(valores, dtype=np.float64) - self.media) / np.sqrt(self.varianza)
+
+
+class AnalisisIncremental:
+    """Análisis de cuentas por pagar que se actualiza con lotes de facturas nuevas.
+
+    ``agregar`` puntúa sólo el lote con el detector persistido y suma su
+    efecto a los agregados: cantidad y monto por estado, media y varianza
+    de los montos, anomalías y antigüedad de saldos a ``fecha_corte``. El
+    costo de cada actualización es proporcional al lote, no al histórico.
+    Los z-scores del lote usan las estadísticas con el lote incluido; los
+    de lotes anteriores no se recalculan. Los lotes se puntúan con el
+    modelo del histórico (``huella_detector``); si se empieza sin
+    histórico, el primer lote ajusta uno.
+    """
+
+    VERSION = 2
+
+    def __init__(self, fecha_corte=None, detector=None):
+        self.fecha_corte = pd.Timestamp(fecha_corte or date.today())
+        self.detector = detector
+        self.huella_detector = detector.huella if detector is not None else None
+        self.montos = EstadisticasIncrementales()
+        self.antiguedad = AntiguedadSaldos(self.fecha_corte)
+        self._totales = pd.DataFrame({'size': [], 'sum': []})
+        self.facturas = 0
+        self.anomalias = 0
+
+    @classmethod
+    def desde_analisis(cls, df, fecha_corte=None):
+        """Arranca de un DataFrame ya analizado (``analizar_cuentas_por_pagar`` + ``convertir_a_ars``) sin volver a puntuarlo."""
+        analisis = cls(fecha_corte)
+        analisis.huella_detector = df.attrs.get('huella_detector')
+        analisis.montos.agregar(_montos_float64(df['monto']))
+        analisis._acumular(df)
+        return analisis
+
+    def agregar(self, lote, cotizaciones=None):
+        """Analiza sólo ``lote``, actualiza los agregados y devuelve el lote analizado."""
+        if self.detector is None:
+            self.detector = (obtener_detector_anomalias(huella=self.huella_detector) if self.huella_detector
+                             else obtener_detector_anomalias(lote, fecha_actual=self.fecha_corte))
+            self.huella_detector = self.detector.huella
+        self.montos.agregar(_montos_float64(lote['monto']))
+        analizado = _columnas_analisis(lote, self.detector.puntuar(lote, self.fecha_corte),
+                                       self.montos.zscore(lote['monto']), self.fecha_corte)
+        if 'monto_ars' not in analizado:
+            analizado = convertir_a_ars(analizado, obtener_cotizaciones() if cotizaciones is None else cotizaciones)
+        self._acumular(analizado)
+        return analizado
+
+    def _acumular(self, analizado):
+        totales = _totales_por_estado(analizado, 'estado', 'monto_ars')
+        self._totales = self._totales.add(totales, fill_value=0)
+        self.antiguedad.agregar(analizado)
+        self.facturas += len(analizado)
+        self.anomalias += int((analizado['is_anomaly'] == -1).sum())
+
+    def totales(self):
+        """Cantidad y monto por estado de todas las facturas incorporadas."""
+        return self._totales.astype({'size': np.int64})
+
+    def actualizar_resumen(self, resumen):
+        """``resumen`` con el rubro de cuentas por pagar, las vencidas y las anomalías de este análisis."""
+        totales = self.totales()
+        valores = [_valores_estado(totales, 'Pendiente')]
+        valores += [(rubro.cantidad, rubro.monto) for rubro in resumen.rubros[1:]]
+        return _armar_resumen(valores, _valores_estado(totales, 'Vencida')[0], self.anomalias)
+
+    def __getstate__(self):
+        # El detector se persiste por separado (ver ``obtener_detector_anomalias``)
+        return {**self.__dict__, 'detector': None}
+
+    def guardar(self, ruta=RUTA_ANALISIS_INCREMENTAL):
+        """Guarda los agregados (no las facturas) con escritura atómica, como ``DetectorAnomalias.guardar``."""
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        temporal = f'{ruta}.{os.getpid()}.tmp'
+        joblib.dump({'version': self.VERSION, 'analisis': self}, temporal)
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta=RUTA_ANALISIS_INCREMENTAL):
+        contenido = joblib.load(ruta)
+        if contenido.get('version') != cls.VERSION:
+            raise ValueError(f"El análisis en {ruta} no es compatible con esta versión")
+        return contenido['analisis']
+
+
+def actualizar_analisis_cuentas(lote, ruta=RUTA_ANALISIS_INCREMENTAL):
+    """Incorpora ``lote`` al análisis guardado en ``ruta`` (o empieza uno) y lo vuelve a guardar.
+
+    Devuelve el análisis actualizado y el lote analizado.
+    """
+    analisis = AnalisisIncremental.cargar(ruta) if os.path.exists(ruta) else AnalisisIncremental()
+    analizado = analisis.agregar(lote)
+    analisis.guardar(ruta)
+    return analisis, analizado
+
 
 # =================================================================
-# FUNCIONES DE GENERACIÓN DE DATOS
+# FUNCIONES DE GENERACIÓN DE REPORTES
 # =================================================================
 
-@st.cache_data
-def generar_cuentas_por_pagar():
-    """Genera datos simulados de cuentas por pagar."""
-    np.random.seed(42)
-    num_registros = 50
-    fecha_actual = datetime.now()
+FILAS_MAX_EXCEL = 1_048_576
+UMBRAL_EXCEL_STREAMING = 200_000
+
+
+def _informar(progreso, fraccion, etapa):
+    """Avisa a ``progreso(fraccion, etapa)`` si el llamador lo pidió."""
+    if progreso is not None:
+        progreso(fraccion, etapa)
+
+
+# Anexos del informe con normas: filas por página y alto fijo de fila, así
+# cada bloque entra en una página y reportlab no tiene que partir tablas
+FILAS_POR_PAGINA_ANEXO = 45
+ALTO_FILA_ANEXO = 12
+# (columna, encabezado, ancho en pulgadas, formato)
+COLUMNAS_ANEXO_VENCIDAS = (
+    ('id_factura', 'ID', 0.85, 'texto'),
+    ('proveedor', 'PROVEEDOR', 1.45, 'texto'),
+    ('fecha_vencimiento', 'VENCIMIENTO', 0.75, 'fecha'),
+    ('dias_atraso', 'DÍAS ATRASO', 0.6, 'entero'),
+    ('moneda', 'MONEDA', 0.5, 'texto'),
+    ('monto', 'MONTO', 0.95, 'monto'),
+    ('monto_ars', 'MONTO ARS', 1.05, 'monto')
+)
+COLUMNAS_ANEXO_ANOMALIAS = (
+    ('id_factura', 'ID', 0.85, 'texto'),
+    ('proveedor', 'PROVEEDOR', 1.45, 'texto'),
+    ('fecha_vencimiento', 'VENCIMIENTO', 0.75, 'fecha'),
+    ('moneda', 'MONEDA', 0.5, 'texto'),
+    ('monto_ars', 'MONTO ARS', 1.05, 'monto'),
+    ('monto_zscore', 'Z-SCORE', 0.6, 'decimal'),
+    ('anomaly_score', 'PUNTAJE', 0.65, 'decimal')
+)
+COLUMNAS_ANEXO_DUPLICADOS = (
+    ('grupo_duplicado', 'GRUPO', 0.5, 'entero'),
+    ('id_factura', 'ID', 0.85, 'texto'),
+    ('proveedor', 'PROVEEDOR', 1.45, 'texto'),
+    ('fecha_emision', 'EMISIÓN', 0.75, 'fecha'),
+    ('moneda', 'MONEDA', 0.5, 'texto'),
+    ('monto', 'MONTO', 0.95, 'monto'),
+    ('monto_ars', 'MONTO ARS', 1.05, 'monto')
+)
+
+
+class FlowablesPerezosos:
+    """Lista de flowables que se genera a medida que ``doc.build`` la consume.
 
-    ids_factura = [f'INV-{i:04d}' for i in range(num_registros)]
-    proveedores = [f'Proveedor_{i}' for i in random.choices(range(1, 21), k=num_registros)]
-    montos = [round(random.uniform(100, 75000), 2) for _ in range(num_registros)]
-    monedas = random.choices(['USD', 'ARS', 'EUR'], weights=[0.5, 0.4, 0.1], k=num_registros)
-    estados_posibles = ['Pendiente', 'Pagada', 'Vencida']
-
-    fechas_emision = []
-    fechas_vencimiento = []
-    estados_final = []
-
-    for _ in range(num_registros):
-        emision = fecha_actual - timedelta(days=random.randint(10, 730))
-        vencimiento_base = emision + timedelta(days=random.randint(5, 120))
-        estado = random.choices(estados_posibles, weights=[0.65, 0.25, 0.10], k=1)[0]
-
-        if estado == 'Vencida':
-            vencimiento = fecha_actual - timedelta(days=random.randint(1, 180))
-            if emision >= vencimiento:
-                emision = vencimiento - timedelta(days=random.randint(5, 60))
-        elif estado == 'Pendiente':
-            vencimiento = fecha_actual + timedelta(days=random.randint(1, 90))
-            if emision >= vencimiento:
-                emision = vencimiento - timedelta(days=random.randint(5, 60))
+    reportlab sólo lee y modifica el principio de la lista, así que en
+    memoria queda únicamente lo que falta maquetar de la página en curso.
+    ``total`` es la cantidad exacta de elementos que produce el iterador;
+    ``build`` la usa para estimar el avance.
+    """
+
+    def __init__(self, iterable, total):
+        self._iterador = iter(iterable)
+        self._cargados = []
+        self._restantes = total
+
+    def _cargar(self, cantidad):
+        while len(self._cargados) < cantidad and self._restantes > 0:
+            self._cargados.append(next(self._iterador))
+            self._restantes -= 1
+
+    def _cargar_hasta(self, indice):
+        if isinstance(indice, slice):
+            self._cargar(indice.indices(len(self))[1])
         else:
-            vencimiento = vencimiento_base
+            self._cargar(indice + 1 if indice >= 0 else len(self))
 
-        fechas_emision.append(emision)
-        fechas_vencimiento.append(vencimiento)
-        estados_final.append(estado)
+    def __len__(self):
+        return len(self._cargados) + self._restantes
 
-    return pd.DataFrame({
-        'id_factura': ids_factura,
-        'proveedor': proveedores,
-        'fecha_emision': fechas_emision,
-        'fecha_vencimiento': fechas_vencimiento,
-        'monto': montos,
-        'moneda': monedas,
-        'estado': estados_final
-    })
+    def __getitem__(self, indice):
+        self._cargar_hasta(indice)
+        return self._cargados[indice]
 
+    def __setitem__(self, indice, valor):
+        self._cargar_hasta(indice)
+        self._cargados[indice] = valor
 
-@st.cache_data
-def analizar_cuentas_por_pagar(df):
-    """Analiza cuentas por pagar."""
-    df['fecha_emision'] = pd.to_datetime(df['fecha_emision'])
-    df['fecha_vencimiento'] = pd.to_datetime(df['fecha_vencimiento'])
-    fecha_actual = datetime.now()
-    
-    df['dias_hasta_vencimiento'] = (df['fecha_vencimiento'] - fecha_actual).dt.days
-    df['monto_zscore'] = zscore(df['monto'])
-    
-    features = df[['monto', 'dias_hasta_vencimiento']].fillna(0)
-    iso_forest = IsolationForest(random_state=42, contamination=0.1)
-    df['is_anomaly'] = iso_forest.fit_predict(features)
-    
-    return df
+    def __delitem__(self, indice):
+        self._cargar_hasta(indice)
+        del self._cargados[indice]
 
+    def insert(self, indice, valor):
+        self._cargados.insert(indice, valor)
 
-@st.cache_data
-def generar_prestamos():
-    """Genera datos de préstamos."""
-    np.random.seed(42)
-    num_prestamos = 50
-    
-    data = []
-    for i in range(num_prestamos):
-        data.append({
-            'ID_Prestamo': f'LOAN-{i+1:04d}',
-            'Fecha_Obtencion': datetime.now() - timedelta(days=random.randint(0, 730)),
-            'Monto_Prestamo': round(random.uniform(10000, 500000), 2),
-            'Tasa_Interes_Anual': round(random.uniform(0.05, 0.20), 4),
-            'Plazo_Meses': random.randint(12, 61),
-            'Estado_Pago': random.choice(['Activo', 'Pagado', 'Atrasado', 'Cancelado'])
-        })
-    
-    return pd.DataFrame(data)
 
+@functools.cache
+def _estilo_tabla_anexo():
+    """Estilo compartido por todas las tablas de los anexos."""
+    from reportlab.lib import colors
+    from reportlab.platypus import TableStyle
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f77b4')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 7),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('TOPPADDING', (0, 0), (-1, -1), 1),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f2f2f2')]),
+        ('LINEBELOW', (0, 0), (-1, -1), 0.25, colors.grey),
+    ])
 
-@st.cache_data
-def generar_remuneraciones():
-    """Genera datos de nómina."""
-    np.random.seed(123)
-    fake = Faker('es_AR')
-    Faker.seed(123)
-    
-    departamentos = ['Ventas', 'Marketing', 'Finanzas', 'Operaciones', 'IT', 'RRHH']
-    datos = []
-    
-    for i in range(100):
-        departamento = random.choice(departamentos)
-        salario_bruto = round(random.uniform(50000, 300000), 2)
-        
-        datos.append({
-            'ID_Empleado': f'EMP-{i+1:04d}',
-            'Nombre': fake.name(),
-            'Departamento': departamento,
-            'Salario_Bruto': salario_bruto,
-            'Aportes_Patronales': salario_bruto * 0.23,
-            'Salario_Neto': salario_bruto * 0.83
-        })
-    
-    return pd.DataFrame(datos)
 
+def _formatear_columna(df, columna, filas, formato):
+    """Textos de ``columna`` en las posiciones ``filas``, sin copiar el resto de la tabla."""
+    if columna == 'dias_atraso':
+        return (-df['dias_hasta_vencimiento'].to_numpy()[filas]).astype(np.int64).astype(str).tolist()
+    formato_id = df.attrs.get('ids', {}).get(columna)
+    if formato_id:
+        return _formatear_ids(formato_id[0], df[columna].to_numpy()[filas], formato_id[1]).tolist()
+    serie = df[columna].take(filas)
+    if formato == 'fecha':
+        return pd.to_datetime(serie).dt.strftime('%d/%m/%Y').tolist()
+    if formato == 'monto':
+        return [f"{valor:,.2f}" for valor in _montos_float64(serie)]
+    if formato == 'decimal':
+        return [f"{valor:.3f}" for valor in serie.to_numpy(dtype=np.float64)]
+    if formato == 'entero':
+        return serie.astype(np.int64).astype(str).tolist()
+    return serie.astype(str).str.slice(0, 32).tolist()
 
-@st.cache_data
-def generar_cargas_fiscales():
-    """Genera obligaciones fiscales."""
-    np.random.seed(42)
-    
-    tipos = ['IVA', 'Ganancias', 'Ingresos Brutos', 'Aportes', 'Bienes Personales']
-    estados = ['Pendiente', 'Pagado', 'Vencido']
-    
-    data = []
-    for i in range(50):
-        tipo = random.choice(tipos)
-        fecha_venc = datetime.now() + timedelta(days=random.randint(-90, 90))
-        
-        data.append({
-            'id_impuesto': f'IMP-{i:04d}',
-            'tipo_impuesto': tipo,
-            'fecha_vencimiento': fecha_venc,
-            'monto_ars': round(random.uniform(50000, 5000000), 2),
-            'estado_pago': random.choice(estados)
-        })
-    
-    return pd.DataFrame(data)
 
+def _anexo_normas(titulo, df, posiciones, columnas, estilo_titulo, estilo_texto):
+    """Flowables de un anexo y su cantidad: un bloque de ``FILAS_POR_PAGINA_ANEXO`` filas por página.
 
-@st.cache_data
-def generar_datos_consolidados():
-    """Genera todos los datos para el informe consolidado."""
-    return {
-        'cuentas': analizar_cuentas_por_pagar(generar_cuentas_por_pagar()),
-        'prestamos': generar_prestamos(),
-        'remuneraciones': generar_remuneraciones(),
-        'fiscales': generar_cargas_fiscales()
-    }
+    Las tablas comparten anchos, alto de fila y ``_estilo_tabla_anexo()``, así
+    que reportlab no mide celdas; cada bloque se arma sólo cuando se maqueta.
+    """
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Table, Paragraph, PageBreak
 
+    bloques = -(-len(posiciones) // FILAS_POR_PAGINA_ANEXO)
+    encabezados = [encabezado for _, encabezado, _, _ in columnas]
+    anchos = [ancho * inch for _, _, ancho, _ in columnas]
 
-# =================================================================
-# FUNCIONES DE GENERACIÓN DE REPORTES
-# =================================================================
+    def flowables():
+        yield PageBreak()
+        yield Paragraph(titulo, estilo_titulo)
+        yield Paragraph(f"{len(posiciones):,} registros.", estilo_texto)
+        for numero in range(bloques):
+            if numero:
+                yield PageBreak()
+            filas = posiciones[numero * FILAS_POR_PAGINA_ANEXO:(numero + 1) * FILAS_POR_PAGINA_ANEXO]
+            valores = [_formatear_columna(df, columna, filas, formato) for columna, _, _, formato in columnas]
+            yield Table([encabezados, *zip(*valores)], colWidths=anchos,
+                        rowHeights=ALTO_FILA_ANEXO, style=_estilo_tabla_anexo())
 
-def crear_informe_pdf_simple(datos):
+    return flowables(), 3 + max(2 * bloques - 1, 0)
+
+
+def _construir_pdf(doc, story, progreso=None, desde=0.0):
+    """``doc.build`` informando el avance de la maquetación entre ``desde`` y 1."""
+    if progreso is not None:
+        total = [1]
+
+        def avance(tipo, valor):
+            if tipo == 'SIZE_EST':
+                total[0] = max(valor, 1)
+            elif tipo == 'PROGRESS':
+                progreso(desde + (1 - desde) * min(valor / total[0], 1.0), 'Maquetación del PDF')
+
+        doc.setProgressCallBack(avance)
+    with medir_etapa('reportlab_build'):
+        doc.build(story)
+
+
+@instrumentar
+def crear_informe_pdf_simple(datos, resumen=None, progreso=None):
     """Genera un informe PDF simple."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.enums import TA_CENTER
+
+    _informar(progreso, 0.0, 'Resumen ejecutivo')
+    resumen = resumen or calcular_resumen_pasivos(datos)
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch)
     story = []
@@ -276,25 +2343,10 @@ def crear_informe_pdf_simple(datos):
     story.append(Paragraph("1. RESUMEN EJECUTIVO", heading_style))
     story.append(Spacer(1, 0.2*inch))
     
-    df_cuentas = datos['cuentas']
-    df_prestamos = datos['prestamos']
-    df_rrhh = datos['remuneraciones']
-    df_fiscales = datos['fiscales']
-    
-    resumen_data = [
-        ['CATEGORÍA', 'CANTIDAD', 'MONTO TOTAL ($)'],
-        ['Cuentas por Pagar', 
-         str(len(df_cuentas[df_cuentas['estado'] == 'Pendiente'])),
-         f"{df_cuentas[df_cuentas['estado'] == 'Pendiente']['monto'].sum():,.2f}"],
-        ['Préstamos Activos', 
-         str(len(df_prestamos[df_prestamos['Estado_Pago'] == 'Activo'])),
-         f"{df_prestamos[df_prestamos['Estado_Pago'] == 'Activo']['Monto_Prestamo'].sum():,.2f}"],
-        ['Nómina Mensual', 
-         str(len(df_rrhh)),
-         f"{df_rrhh['Salario_Bruto'].sum():,.2f}"],
-        ['Cargas Fiscales', 
-         str(len(df_fiscales[df_fiscales['estado_pago'] == 'Pendiente'])),
-         f"{df_fiscales[df_fiscales['estado_pago'] == 'Pendiente']['monto_ars'].sum():,.2f}"]
+    categorias = ['Cuentas por Pagar', 'Préstamos Activos', 'Nómina Mensual', 'Cargas Fiscales']
+    resumen_data = [['CATEGORÍA', 'CANTIDAD', 'MONTO TOTAL ($)']] + [
+        [categoria, str(rubro.cantidad), f"{rubro.monto:,.2f}"]
+        for categoria, rubro in zip(categorias, resumen.rubros)
     ]
     
     tabla_resumen = Table(resumen_data, colWidths=[3*inch, 1.5*inch, 2*inch])
@@ -314,13 +2366,34 @@ def crear_informe_pdf_simple(datos):
     
     story.append(tabla_resumen)
     
-    doc.build(story)
+    _construir_pdf(doc, story, progreso, 0.1)
     buffer.seek(0)
     return buffer
 
 
-def crear_informe_excel(datos):
-    """Genera un informe Excel."""
+def _resumen_excel(resumen):
+    """Hoja de resumen compartida por los dos modos de exportación a Excel."""
+    return pd.DataFrame({
+        'Categoría': list(CATEGORIAS_RUBROS),
+        'Cantidad_Registros': [rubro.cantidad for rubro in resumen.rubros],
+        'Monto_Total': [rubro.monto for rubro in resumen.rubros]
+    })
+
+
+@instrumentar
+def crear_informe_excel(datos, streaming=None, resumen=None, progreso=None):
+    """Genera un informe Excel.
+
+    Con ``streaming=None`` se elige el modo según el tamaño de los datos:
+    por encima de ``UMBRAL_EXCEL_STREAMING`` filas se usa
+    ``crear_informe_excel_streaming`` para no armar el libro en memoria.
+    """
+    resumen = resumen or calcular_resumen_pasivos(datos)
+    if streaming is None:
+        streaming = sum(len(df) for df in datos.values()) > UMBRAL_EXCEL_STREAMING
+    if streaming:
+        return crear_informe_excel_streaming(datos, resumen=resumen, progreso=progreso)
+
     buffer = io.BytesIO()
     
     with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
@@ -335,36 +2408,122 @@ def crear_informe_excel(datos):
             'border': 1
         })
         
-        resumen_data = {
-            'Categoría': ['Cuentas por Pagar', 'Préstamos', 'Nómina', 'Cargas Fiscales'],
-            'Cantidad_Registros': [
-                len(datos['cuentas'][datos['cuentas']['estado'] == 'Pendiente']),
-                len(datos['prestamos'][datos['prestamos']['Estado_Pago'] == 'Activo']),
-                len(datos['remuneraciones']),
-                len(datos['fiscales'][datos['fiscales']['estado_pago'] == 'Pendiente'])
-            ],
-            'Monto_Total': [
-                datos['cuentas'][datos['cuentas']['estado'] == 'Pendiente']['monto'].sum(),
-                datos['prestamos'][datos['prestamos']['Estado_Pago'] == 'Activo']['Monto_Prestamo'].sum(),
-                datos['remuneraciones']['Salario_Bruto'].sum(),
-                datos['fiscales'][datos['fiscales']['estado_pago'] == 'Pendiente']['monto_ars'].sum()
-            ]
-        }
-        
-        df_resumen = pd.DataFrame(resumen_data)
+        df_resumen = _resumen_excel(resumen)
         df_resumen.to_excel(writer, sheet_name='Resumen', index=False)
         
-        datos['cuentas'].to_excel(writer, sheet_name='Cuentas_por_Pagar', index=False)
-        datos['prestamos'].to_excel(writer, sheet_name='Prestamos', index=False)
-        datos['remuneraciones'].to_excel(writer, sheet_name='Remuneraciones', index=False)
-        datos['fiscales'].to_excel(writer, sheet_name='Cargas_Fiscales', index=False)
+        hojas = [('Cuentas_por_Pagar', 'cuentas'), ('Prestamos', 'prestamos'),
+                 ('Remuneraciones', 'remuneraciones'), ('Cargas_Fiscales', 'fiscales')]
+        for numero, (nombre_hoja, tabla) in enumerate(hojas):
+            _informar(progreso, numero / (len(hojas) + 1), nombre_hoja)
+            expandir_pasivos(datos[tabla]).to_excel(writer, sheet_name=nombre_hoja, index=False)
+        _informar(progreso, len(hojas) / (len(hojas) + 1), 'Guardando el libro')
     
     buffer.seek(0)
     return buffer
 
 
-def crear_informe_auditoria_normas(datos):
-    """Genera informe profesional con normas RT 7, RT 37 y NIAs."""
+def _escribir_hojas_por_bloques(workbook, nombre_hoja, df, header_format, filas_por_bloque):
+    """Escribe ``df`` fila a fila en una o más hojas, bloque por bloque.
+
+    Con ``constant_memory`` xlsxwriter descarga cada fila al disco en cuanto
+    se pasa a la siguiente, así que sólo el bloque actual vive en memoria.
+    Si ``df`` supera el límite de filas de Excel, continúa en hojas
+    ``<nombre>_2``, ``<nombre>_3``, etc.
+    """
+    filas_por_hoja = FILAS_MAX_EXCEL - 1
+    num_hojas = max(1, -(-len(df) // filas_por_hoja))
+
+    for num_hoja in range(num_hojas):
+        nombre = nombre_hoja if num_hoja == 0 else f'{nombre_hoja[:27]}_{num_hoja + 1}'
+        worksheet = workbook.add_worksheet(nombre)
+        worksheet.write_row(0, 0, list(df.columns), header_format)
+
+        inicio_hoja = num_hoja * filas_por_hoja
+        fin_hoja = min(inicio_hoja + filas_por_hoja, len(df))
+        fila = 1
+        for inicio in range(inicio_hoja, fin_hoja, filas_por_bloque):
+            bloque = expandir_pasivos(df.iloc[inicio:min(inicio + filas_por_bloque, fin_hoja)])
+            columnas = [bloque[col].astype(object).where(bloque[col].notna(), None).tolist()
+                        for col in bloque.columns]
+            for valores in zip(*columnas):
+                worksheet.write_row(fila, 0, valores)
+                fila += 1
+
+
+@instrumentar
+def crear_informe_excel_streaming(datos, filas_por_bloque=50_000, resumen=None, progreso=None):
+    """Genera el informe Excel en disco con memoria acotada.
+
+    Devuelve el archivo temporal abierto en modo lectura para entregarlo
+    directamente a ``st.download_button``.
+    """
+    resumen = resumen or calcular_resumen_pasivos(datos)
+    with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as tmp:
+        ruta = tmp.name
+
+    workbook = xlsxwriter.Workbook(ruta, {
+        'constant_memory': True,
+        'nan_inf_to_errors': True,
+        'default_date_format': 'dd/mm/yyyy'
+    })
+    header_format = workbook.add_format({
+        'bold': True,
+        'text_wrap': True,
+        'valign': 'top',
+        'fg_color': '#1f77b4',
+        'font_color': 'white',
+        'border': 1
+    })
+
+    hojas = [
+        ('Resumen', _resumen_excel(resumen)),
+        ('Cuentas_por_Pagar', datos['cuentas']),
+        ('Prestamos', datos['prestamos']),
+        ('Remuneraciones', datos['remuneraciones']),
+        ('Cargas_Fiscales', datos['fiscales'])
+    ]
+    for numero, (nombre_hoja, df) in enumerate(hojas):
+        _informar(progreso, numero / (len(hojas) + 1), nombre_hoja)
+        _escribir_hojas_por_bloques(workbook, nombre_hoja, df, header_format, filas_por_bloque)
+    _informar(progreso, len(hojas) / (len(hojas) + 1), 'Guardando el libro')
+    workbook.close()
+
+    archivo = open(ruta, 'rb')
+    os.unlink(ruta)
+    return archivo
+
+
+@instrumentar
+def crear_informe_consolidado(resumenes):
+    """Excel del grupo a partir de ``{Entidad: ResumenPasivos}``: totales por rubro y detalle por entidad."""
+    buffer = io.BytesIO()
+    grupo = combinar_resumenes(resumenes.values())
+    with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
+        _resumen_excel(grupo).assign(
+            Porcentaje=[rubro.porcentaje for rubro in grupo.rubros]
+        ).to_excel(writer, sheet_name='Grupo', index=False)
+        tabla_consolidada(resumenes).to_excel(writer, sheet_name='Entidades', index=False)
+    buffer.seek(0)
+    return buffer
+
+
+@instrumentar
+def crear_informe_auditoria_normas(datos, resumen=None, entidad=ENTIDAD_EJEMPLO, progreso=None, anexos=False):
+    """Genera informe profesional con normas RT 7, RT 37 y NIAs para ``entidad``.
+
+    Con ``anexos`` agrega el detalle de todas las facturas vencidas, de
+    todas las anomalías y de las posibles facturas duplicadas, maquetado
+    por páginas (ver ``_anexo_normas``).
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+    from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+
+    _informar(progreso, 0.0, 'Resumen de pasivos')
+    resumen = resumen or calcular_resumen_pasivos(datos)
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.75*inch, bottomMargin=0.75*inch)
     story = []
@@ -421,8 +2580,8 @@ def crear_informe_auditoria_normas(datos):
     story.append(Spacer(1, 0.3*inch))
     
     info_data = [
-        ['Empresa Auditada:', 'EMPRESA EJEMPLO S.A.'],
-        ['CUIT:', '30-12345678-9'],
+        ['Empresa Auditada:', entidad.nombre],
+        ['CUIT:', entidad.cuit],
         ['Período Auditado:', f'{fecha_actual.strftime("%m/%Y")}'],
         ['Fecha del Informe:', fecha_str],
         ['Normas Aplicadas:', 'RT 7, RT 37, NIAs']
@@ -445,11 +2604,12 @@ def crear_informe_auditoria_normas(datos):
     story.append(Spacer(1, 0.4*inch))
     
     # I. IDENTIFICACIÓN
+    _informar(progreso, 0.05, 'I. Identificación')
     story.append(Paragraph("I. IDENTIFICACIÓN DEL ENTE Y PERÍODO AUDITADO", subtitle_style))
     story.append(Spacer(1, 0.1*inch))
     
-    texto_id = f"""Hemos auditado los pasivos corrientes de <b>EMPRESA EJEMPLO S.A.</b>, 
-    CUIT 30-12345678-9, correspondientes al período finalizado el {fecha_str}. La auditoría 
+    texto_id = f"""Hemos auditado los pasivos corrientes de <b>{entidad.nombre}</b>, 
+    CUIT {entidad.cuit}, correspondientes al período finalizado el {fecha_str}. La auditoría 
     se realizó conforme a las <b>Normas Internacionales de Auditoría (NIAs)</b> y las 
     <b>Resoluciones Técnicas 7 y 37</b> de FACPCE."""
     
@@ -457,6 +2617,7 @@ def crear_informe_auditoria_normas(datos):
     story.append(Spacer(1, 0.2*inch))
     
     # II. ALCANCE
+    _informar(progreso, 0.1, 'II. Alcance')
     story.append(Paragraph("II. ALCANCE DEL TRABAJO", subtitle_style))
     story.append(Paragraph("2.1. Procedimientos Aplicados (Según RT 7)", heading_style))
     
@@ -478,40 +2639,16 @@ def crear_informe_auditoria_normas(datos):
     story.append(PageBreak())
     
     # III. RESUMEN DE HALLAZGOS
+    _informar(progreso, 0.15, 'III. Resumen de hallazgos')
     story.append(Paragraph("III. RESUMEN DE HALLAZGOS", subtitle_style))
     
-    df_cuentas = datos['cuentas']
-    df_prestamos = datos['prestamos']
-    df_rrhh = datos['remuneraciones']
-    df_fiscales = datos['fiscales']
+    total_pasivos = resumen.total
+    rubros = ['Cuentas por Pagar', 'Préstamos', 'Remuneraciones', 'Cargas Fiscales']
     
-    total_pasivos = (
-        df_cuentas[df_cuentas['estado'] == 'Pendiente']['monto'].sum() +
-        df_prestamos[df_prestamos['Estado_Pago'] == 'Activo']['Monto_Prestamo'].sum() +
-        df_rrhh['Salario_Bruto'].sum() +
-        df_fiscales[df_fiscales['estado_pago'] == 'Pendiente']['monto_ars'].sum()
-    )
-    
-    resumen_data = [
-        ['RUBRO', 'CANTIDAD', 'SALDO ($)', '% TOTAL'],
-        ['Cuentas por Pagar',
-         str(len(df_cuentas[df_cuentas['estado'] == 'Pendiente'])),
-         f"{df_cuentas[df_cuentas['estado'] == 'Pendiente']['monto'].sum():,.2f}",
-         f"{(df_cuentas[df_cuentas['estado'] == 'Pendiente']['monto'].sum() / total_pasivos * 100):.1f}%"],
-        ['Préstamos',
-         str(len(df_prestamos[df_prestamos['Estado_Pago'] == 'Activo'])),
-         f"{df_prestamos[df_prestamos['Estado_Pago'] == 'Activo']['Monto_Prestamo'].sum():,.2f}",
-         f"{(df_prestamos[df_prestamos['Estado_Pago'] == 'Activo']['Monto_Prestamo'].sum() / total_pasivos * 100):.1f}%"],
-        ['Remuneraciones',
-         str(len(df_rrhh)),
-         f"{df_rrhh['Salario_Bruto'].sum():,.2f}",
-         f"{(df_rrhh['Salario_Bruto'].sum() / total_pasivos * 100):.1f}%"],
-        ['Cargas Fiscales',
-         str(len(df_fiscales[df_fiscales['estado_pago'] == 'Pendiente'])),
-         f"{df_fiscales[df_fiscales['estado_pago'] == 'Pendiente']['monto_ars'].sum():,.2f}",
-         f"{(df_fiscales[df_fiscales['estado_pago'] == 'Pendiente']['monto_ars'].sum() / total_pasivos * 100):.1f}%"],
-        ['TOTAL', '', f"{total_pasivos:,.2f}", '100.0%']
-    ]
+    resumen_data = [['RUBRO', 'CANTIDAD', 'SALDO ($)', '% TOTAL']] + [
+        [nombre, str(rubro.cantidad), f"{rubro.monto:,.2f}", f"{rubro.porcentaje:.1f}%"]
+        for nombre, rubro in zip(rubros, resumen.rubros)
+    ] + [['TOTAL', '', f"{total_pasivos:,.2f}", '100.0%']]
     
     tabla_resumen = Table(resumen_data, colWidths=[2.5*inch, 1*inch, 1.8*inch, 1*inch])
     tabla_resumen.setStyle(TableStyle([
@@ -530,23 +2667,57 @@ def crear_informe_auditoria_normas(datos):
     story.append(Spacer(1, 0.3*inch))
     
     # IV. HALLAZGOS ESPECÍFICOS
+    _informar(progreso, 0.2, 'IV. Hallazgos específicos')
     story.append(Paragraph("IV. HALLAZGOS ESPECÍFICOS", subtitle_style))
     
-    facturas_vencidas = len(df_cuentas[df_cuentas['estado'] == 'Vencida'])
-    anomalias = (df_cuentas['is_anomaly'] == -1).sum()
+    facturas_vencidas = resumen.facturas_vencidas
+    anomalias = resumen.anomalias
     
     hallazgo = f"""<b>Cuentas por Pagar:</b> Se identificaron {facturas_vencidas} facturas 
     vencidas y {anomalias} transacciones con características atípicas.<br/><br/>
     <b>Recomendación (RT 7):</b> Implementar sistema de alertas tempranas para vencimientos."""
     
     story.append(Paragraph(hallazgo, body_style))
+    
+    concentracion = concentracion_proveedores(datos['cuentas'])
+    duplicados = detectar_duplicados(datos['cuentas'])
+    grupos_duplicados, facturas_duplicadas, monto_repetido = duplicados.total()
+    hallazgo = f"""<b>Concentración de proveedores:</b> índice Herfindahl-Hirschman de 
+    {concentracion.hhi:,.0f} (concentración {concentracion.nivel.lower()}), equivalente a 
+    {concentracion.equivalentes:,.1f} proveedores de igual tamaño; el principal concentra el 
+    {concentracion.principal:.1%} del monto facturado y los cinco principales el 
+    {concentracion.cinco_principales:.1%}.<br/><br/>
+    <b>Posibles duplicados:</b> {grupos_duplicados} grupos con {facturas_duplicadas} facturas del 
+    mismo proveedor, moneda y monto emitidas con hasta {duplicados.ventana} días de diferencia, 
+    por ${monto_repetido:,.2f} repetidos.<br/><br/>
+    <b>Recomendación (NIA 240):</b> Verificar con el proveedor y los registros de pago cada 
+    grupo antes de cancelar las facturas involucradas."""
+    story.append(Paragraph(hallazgo, body_style))
+    
+    antiguedad = analizar_antiguedad(datos['cuentas'], fecha_actual.date()).totales()
+    story.append(Paragraph("Antigüedad de saldos impagos de cuentas por pagar", heading_style))
+    antiguedad_data = [['TRAMO (DÍAS)', 'FACTURAS', 'SALDO ($)']] + [
+        [tramo, str(fila.Cantidad), f"{fila.Monto:,.2f}"] for tramo, fila in antiguedad.iterrows()
+    ] + [['TOTAL', str(antiguedad['Cantidad'].sum()), f"{antiguedad['Monto'].sum():,.2f}"]]
+    tabla_antiguedad = Table(antiguedad_data, colWidths=[2*inch, 1.3*inch, 2*inch])
+    tabla_antiguedad.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f77b4')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#e8f4f8')),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ]))
+    story.append(tabla_antiguedad)
     story.append(PageBreak())
     
     # VII. OPINIÓN
+    _informar(progreso, 0.3, 'VII. Opinión')
     story.append(Paragraph("VII. OPINIÓN PROFESIONAL", subtitle_style))
     
     opinion = f"""En nuestra opinión, basada en la auditoría realizada conforme a las NIAs 
-    y RT 7 y 37, los pasivos corrientes de EMPRESA EJEMPLO S.A. al {fecha_str}, por un total 
+    y RT 7 y 37, los pasivos corrientes de {entidad.nombre} al {fecha_str}, por un total 
     de ${total_pasivos:,.2f}, se presentan razonablemente en todos sus aspectos significativos."""
     
     story.append(Paragraph(opinion, body_style))
@@ -568,15 +2739,230 @@ def crear_informe_auditoria_normas(datos):
     
     story.append(tabla_firma)
     
-    doc.build(story)
+    if anexos:
+        cuentas = datos['cuentas']
+        vencidas = np.flatnonzero((cuentas['estado'] == 'Vencida').to_numpy())
+        vencimientos = pd.to_datetime(cuentas['fecha_vencimiento']).to_numpy()[vencidas]
+        partes = [_anexo_normas("ANEXO A. FACTURAS VENCIDAS", cuentas,
+                                vencidas[np.argsort(vencimientos, kind='stable')],
+                                COLUMNAS_ANEXO_VENCIDAS, subtitle_style, body_style)]
+        if 'is_anomaly' in cuentas:
+            anomalas = np.flatnonzero((cuentas['is_anomaly'] == -1).to_numpy())
+            puntajes = cuentas['anomaly_score'].to_numpy()[anomalas]
+            partes.append(_anexo_normas("ANEXO B. TRANSACCIONES ATÍPICAS (ISOLATION FOREST)", cuentas,
+                                        anomalas[np.argsort(puntajes, kind='stable')],
+                                        COLUMNAS_ANEXO_ANOMALIAS, subtitle_style, body_style))
+        candidatas = duplicados.candidatas()
+        partes.append(_anexo_normas("ANEXO C. POSIBLES FACTURAS DUPLICADAS", candidatas,
+                                    np.arange(len(candidatas)), COLUMNAS_ANEXO_DUPLICADOS,
+                                    subtitle_style, body_style))
+        story = FlowablesPerezosos(itertools.chain(story, *(flujo for flujo, _ in partes)),
+                                   len(story) + sum(cantidad for _, cantidad in partes))
+    
+    _construir_pdf(doc, story, progreso, 0.35)
     buffer.seek(0)
     return buffer
 
 
+# =================================================================
+# CACHÉ DE INFORMES
+# =================================================================
+
+DIRECTORIO_CACHE_INFORMES = os.path.join(DIRECTORIO_DATOS, 'informes')
+LIMITE_CACHE_INFORMES_BYTES = int(os.environ.get('PASIVOS_LIMITE_CACHE_INFORMES_MB', '512')) * 1024 ** 2
+TTL_CACHE_INFORMES = int(os.environ.get('PASIVOS_TTL_INFORMES_MIN', '60')) * 60
+VERSION_INFORMES = 2
+
+
+def huella_tabla(df):
+    """SHA-256 del contenido de ``df`` (columnas, tipos y valores)."""
+    digesto = hashlib.sha256(repr((list(df.columns), [str(dtype) for dtype in df.dtypes])).encode())
+    digesto.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digesto.hexdigest()
+
+
+def _clave_informe(constructor, datos, kwargs, huella_datos=None):
+    """Clave del informe: tipo, huella de los datos, fecha del día (los informes la imprimen) y opciones.
+
+    Sin ``huella_datos`` se recorre el contenido de cada tabla (``huella_tabla``).
+    """
+    opciones = sorted((nombre, valor) for nombre, valor in kwargs.items() if nombre != 'progreso')
+    huellas = huella_datos or sorted((tabla, huella_tabla(df)) for tabla, df in datos.items())
+    firma = repr((VERSION_INFORMES, constructor.__name__, huellas, date.today().isoformat(), opciones))
+    return f"{constructor.__name__}-{hashlib.sha256(firma.encode()).hexdigest()[:24]}"
+
+
+def _desalojar_cache_informes(directorio=DIRECTORIO_CACHE_INFORMES, limite=LIMITE_CACHE_INFORMES_BYTES,
+                              ttl=TTL_CACHE_INFORMES):
+    """Borra los informes vencidos y después los más viejos hasta quedar bajo ``limite`` bytes."""
+    ahora = time.time()
+    entradas = []
+    for entrada in os.scandir(directorio):
+        if not entrada.is_file() or entrada.name.startswith('.'):
+            continue
+        estado = entrada.stat()
+        if ahora - estado.st_mtime >= ttl:
+            with contextlib.suppress(OSError):
+                os.unlink(entrada.path)
+        else:
+            entradas.append((estado.st_mtime, estado.st_size, entrada.path))
+    total = sum(tamano for _, tamano, _ in entradas)
+    for _, tamano, ruta in sorted(entradas):
+        if total <= limite:
+            break
+        with contextlib.suppress(OSError):
+            os.unlink(ruta)
+        total -= tamano
+
+
+def informe_cacheado(constructor, datos, huella_datos=None, **kwargs):
+    """``constructor(datos, **kwargs)`` servido desde ``DIRECTORIO_CACHE_INFORMES`` si ya se generó.
+
+    Devuelve el archivo abierto en modo lectura, igual que los
+    constructores. Un informe vale ``TTL_CACHE_INFORMES`` segundos y, como
+    con la caché Parquet, un error de disco sólo hace que se genere de nuevo.
+    Con ``huella_datos`` (ver ``huella_datos_consolidados``) la clave no
+    recorre las tablas, y ``datos`` puede ser una función sin argumentos
+    que los arma sólo si hay que generar el informe.
+    """
+    if callable(datos) and huella_datos is None:
+        datos = datos()
+    if LIMITE_CACHE_INFORMES_BYTES <= 0:
+        return constructor(datos() if callable(datos) else datos, **kwargs)
+
+    ruta = os.path.join(DIRECTORIO_CACHE_INFORMES, _clave_informe(constructor, datos, kwargs, huella_datos))
+    with contextlib.suppress(OSError):
+        if time.time() - os.path.getmtime(ruta) < TTL_CACHE_INFORMES:
+            with medir_etapa('cache_informes') as evento:
+                evento['cache'] = 'acierto'
+                return open(ruta, 'rb')
+
+    archivo = constructor(datos() if callable(datos) else datos, **kwargs)
+    try:
+        os.makedirs(DIRECTORIO_CACHE_INFORMES, exist_ok=True)
+        with medir_etapa('cache_informes') as evento:
+            evento['cache'] = 'fallo'
+            with tempfile.NamedTemporaryFile(dir=DIRECTORIO_CACHE_INFORMES, prefix='.', delete=False) as temporal:
+                shutil.copyfileobj(archivo, temporal)
+            os.replace(temporal.name, ruta)
+        _desalojar_cache_informes()
+    except OSError:
+        pass
+    archivo.seek(0)
+    return archivo
+
+
+# =================================================================
+# INFORMES EN SEGUNDO PLANO
+# =================================================================
+
+HILOS_INFORMES = int(os.environ.get('PASIVOS_HILOS_INFORMES', min(4, os.cpu_count() or 1)))
+MAX_ARTEFACTOS_INFORMES = 32
+LIMITE_ARTEFACTOS_BYTES = int(os.environ.get('PASIVOS_LIMITE_INFORMES_MB', '512')) * 1024 ** 2
+ESTADOS_FINALES = ('Terminado', 'Error')
+
+
+@dataclass
+class TrabajoInforme:
+    """Estado de un informe encargado a ``ColaInformes``; el hilo que lo genera lo va actualizando."""
+    id: str
+    descripcion: str
+    nombre_archivo: str
+    mime: str
+    estado: str = 'En cola'
+    progreso: float = 0.0
+    etapa: str = ''
+    error: str = ''
+    contenido: bytes = None
+    creado: float = field(default_factory=time.time)
+    terminado: float = None
+
+    @property
+    def finalizado(self):
+        return self.estado in ESTADOS_FINALES
+
+
+class ColaInformes:
+    """Genera informes en un pool de hilos para no bloquear el script de Streamlit.
+
+    ``enviar`` devuelve enseguida el ID del trabajo y el constructor recibe
+    ``progreso(fraccion, etapa)`` para informar cada sección. Los informes
+    terminados quedan en memoria hasta ``max_artefactos`` o ``limite_bytes``
+    en total; al superarlos se descartan los más antiguos. Se usan hilos y
+    no procesos porque los datos y sus cachés viven en este proceso:
+    copiarlos a otro costaría más que el informe.
+    """
+
+    def __init__(self, hilos=HILOS_INFORMES, max_artefactos=MAX_ARTEFACTOS_INFORMES,
+                 limite_bytes=LIMITE_ARTEFACTOS_BYTES):
+        self.max_artefactos = max_artefactos
+        self.limite_bytes = limite_bytes
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='informes')
+        self._trabajos = {}
+        self._lock = threading.Lock()
+
+    def enviar(self, descripcion, nombre_archivo, mime, funcion, *args, **kwargs):
+        """Encola ``funcion(*args, progreso=..., **kwargs)``, que debe devolver un archivo abierto."""
+        trabajo = TrabajoInforme(uuid.uuid4().hex, descripcion, nombre_archivo, mime)
+        with self._lock:
+            self._trabajos[trabajo.id] = trabajo
+        self._pool.submit(self._ejecutar, trabajo, funcion, args, kwargs)
+        return trabajo.id
+
+    def trabajo(self, id_trabajo):
+        """El ``TrabajoInforme`` con ese ID, o ``None`` si no existe o ya se descartó."""
+        return self._trabajos.get(id_trabajo)
+
+    def _ejecutar(self, trabajo, funcion, args, kwargs):
+        def progreso(fraccion, etapa):
+            trabajo.progreso, trabajo.etapa = fraccion, etapa
+
+        trabajo.estado = 'En curso'
+        estado = 'Terminado'
+        try:
+            with contextlib.closing(funcion(*args, progreso=progreso, **kwargs)) as archivo:
+                trabajo.contenido = archivo.read()
+            trabajo.progreso, trabajo.etapa = 1.0, ''
+        except Exception as error:
+            logging.getLogger(__name__).exception("Falló el informe %s", trabajo.descripcion)
+            trabajo.error, estado = str(error), 'Error'
+        # Bajo el lock, para que ``_recortar`` nunca vea un trabajo finalizado sin ``terminado``
+        with self._lock:
+            trabajo.terminado = time.time()
+            trabajo.estado = estado
+        self._recortar()
+
+    def _recortar(self):
+        with self._lock:
+            terminados = sorted((trabajo for trabajo in self._trabajos.values() if trabajo.finalizado),
+                                key=lambda trabajo: trabajo.terminado)
+            total = sum(len(trabajo.contenido or b'') for trabajo in terminados)
+            while terminados and (len(terminados) > self.max_artefactos or total > self.limite_bytes):
+                descartado = terminados.pop(0)
+                total -= len(descartado.contenido or b'')
+                del self._trabajos[descartado.id]
+
+
+def _generar_informe(constructor, progreso=None, **kwargs):
+    """Arma los datos y el informe dentro del trabajo, así el script no espera ninguna de las dos cosas."""
+    _informar(progreso, 0.0, 'Preparando datos')
+    return informe_cacheado(constructor, generar_datos_consolidados, huella_datos_consolidados(),
+                            progreso=progreso, **kwargs)
+
+
+@st.cache_resource
+def cola_informes():
+    """Cola compartida por todas las sesiones del servidor."""
+    return ColaInformes()
+
+
 # =================================================================
 # FUNCIONES DE VISUALIZACIÓN
 # =================================================================
 
+MAX_GRAFICOS_CACHE = 64
+
+
 def crear_grafico_barras(data, x, y, titulo, color='viridis'):
     fig, ax = plt.subplots(figsize=(10, 6))
     if isinstance(data, pd.Series):
@@ -584,8 +2970,8 @@ def crear_grafico_barras(data, x, y, titulo, color='viridis'):
     else:
         sns.barplot(data=data, x=x, y=y, palette=color, ax=ax)
     ax.set_title(titulo, fontsize=14, fontweight='bold', pad=20)
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
+    plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+    fig.tight_layout()
     return fig
 
 
@@ -596,10 +2982,87 @@ def crear_grafico_torta(data, titulo):
               colors=colors_palette, ax=ax, textprops={'fontsize': 10})
     ax.set_title(titulo, fontsize=14, fontweight='bold', pad=20)
     ax.set_ylabel('')
-    plt.tight_layout()
+    fig.tight_layout()
+    return fig
+
+
+def crear_grafico_histograma(conteos, bordes, titulo, color='steelblue', etiqueta='valor'):
+    """Histograma dibujado a partir de los conteos ya agregados (ver ``np.histogram``)."""
+    fig, ax = plt.subplots(figsize=(10, 6))
+    centros = (bordes[:-1] + bordes[1:]) / 2
+    sns.histplot(data=pd.DataFrame({etiqueta: centros, 'conteo': conteos}), x=etiqueta,
+                 weights='conteo', bins=list(bordes), kde=True, color=color, ax=ax)
+    ax.set_title(titulo)
+    fig.tight_layout()
+    return fig
+
+
+def crear_grafico_cajas(estadisticas, titulo):
+    """Diagrama de cajas a partir de los cuartiles por grupo (ver ``_estadisticas_cajas``)."""
+    fig, ax = plt.subplots(figsize=(10, 6))
+    cajas = [{'label': grupo, 'q1': fila.q1, 'med': fila.med, 'q3': fila.q3,
+              'whislo': fila.whislo, 'whishi': fila.whishi}
+             for grupo, fila in estadisticas.iterrows()]
+    artistas = ax.bxp(cajas, showfliers=False, patch_artist=True)
+    for caja, color in zip(artistas['boxes'], sns.color_palette('Set2', len(cajas))):
+        caja.set_facecolor(color)
+    ax.set_title(titulo)
+    plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+    fig.tight_layout()
     return fig
 
 
+def _figura_a_png(fig):
+    """Renderiza la figura a PNG y la cierra, para que no quede registrada en pyplot."""
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, format='png', dpi=100)
+    finally:
+        plt.close(fig)
+    return buffer.getvalue()
+
+
+# Cada gráfico se cachea como PNG según el contenido de su agregado de
+# entrada; st.cache_data descarta el usado hace más tiempo al llenarse.
+
+@cache_datos(max_entries=MAX_GRAFICOS_CACHE)
+def grafico_barras_png(data, x, y, titulo, color='viridis'):
+    return _figura_a_png(crear_grafico_barras(data, x, y, titulo, color))
+
+
+@cache_datos(max_entries=MAX_GRAFICOS_CACHE)
+def grafico_torta_png(data, titulo):
+    return _figura_a_png(crear_grafico_torta(data, titulo))
+
+
+@cache_datos(max_entries=MAX_GRAFICOS_CACHE)
+def grafico_histograma_png(conteos, bordes, titulo, color='steelblue', etiqueta='valor'):
+    return _figura_a_png(crear_grafico_histograma(conteos, bordes, titulo, color, etiqueta))
+
+
+@cache_datos(max_entries=MAX_GRAFICOS_CACHE)
+def grafico_cajas_png(estadisticas, titulo):
+    return _figura_a_png(crear_grafico_cajas(estadisticas, titulo))
+
+
+def _estadisticas_cajas(df, columna_grupo, columna_valor):
+    """Cuartiles y bigotes (1,5 × IQR) por grupo, sin llevar los valores al gráfico."""
+    cuartiles = df.groupby(columna_grupo, observed=True)[columna_valor].quantile([0.25, 0.5, 0.75]).unstack()
+    cuartiles.columns = ['q1', 'med', 'q3']
+    rango = cuartiles['q3'] - cuartiles['q1']
+    grupos = df[columna_grupo]
+    valores = df[columna_valor]
+    limite_inferior = grupos.map(cuartiles['q1'] - 1.5 * rango).astype('float64')
+    limite_superior = grupos.map(cuartiles['q3'] + 1.5 * rango).astype('float64')
+    cuartiles['whislo'] = valores[valores >= limite_inferior].groupby(grupos, observed=True).min()
+    cuartiles['whishi'] = valores[valores <= limite_superior].groupby(grupos, observed=True).max()
+    return cuartiles
+
+
+def mostrar_grafico(png):
+    st.image(png, use_container_width=True)
+
+
 def mostrar_metricas(col, titulo, valor, delta=None, invertir=False):
     with col:
         if delta:
@@ -608,11 +3071,239 @@ def mostrar_metricas(col, titulo, valor, delta=None, invertir=False):
             st.metric(titulo, valor)
 
 
+# =================================================================
+# TABLAS PAGINADAS
+# =================================================================
+
+TAMANOS_PAGINA = (25, 50, 100, 500)
+
+
+def _clave_orden(serie):
+    """Array de NumPy que ordena como la columna (las categorías, alfabéticamente y vacías al final)."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        codigos = serie.cat.codes.to_numpy()
+        rango = np.argsort(np.argsort(serie.cat.categories.astype(str).to_numpy()))
+        return np.where(codigos >= 0, rango[codigos], len(rango))
+    if pd.api.types.is_string_dtype(serie.dtype) or serie.dtype == object:
+        return np.asarray(serie.astype(str), dtype=str)
+    return serie.to_numpy()
+
+
+class IndiceTabla:
+    """Índices para paginar una tabla sin copiarla ni recorrerla en Python.
+
+    Guarda los IDs ordenados (búsqueda con ``searchsorted``) y calcula una
+    sola vez, al pedirlo, el orden de cada columna. Los filtros por categoría
+    se resuelven indexando una tabla de códigos admitidos. Cada página se
+    arma sólo con las filas visibles.
+    """
+
+    def __init__(self, df, columna_id):
+        self.df = df
+        self.columna_id = columna_id
+        formato = df.attrs.get('ids', {}).get(columna_id)
+        self.prefijo = formato[0] if formato else None
+        claves = df[columna_id].to_numpy() if formato else _clave_orden(df[columna_id])
+        self._orden_ids = np.argsort(claves, kind='stable')
+        self._ids_ordenados = claves[self._orden_ids]
+        self._ordenes = {columna_id: self._orden_ids}
+
+    def orden(self, columna):
+        if columna not in self._ordenes:
+            self._ordenes[columna] = np.argsort(_clave_orden(self.df[columna]), kind='stable')
+        return self._ordenes[columna]
+
+    def buscar(self, texto):
+        """Posiciones cuyo ID coincide con ``texto``; con IDs de texto libre, por prefijo."""
+        texto = texto.strip()
+        if self.prefijo is not None:
+            if texto.upper().startswith(self.prefijo.upper()):
+                texto = texto[len(self.prefijo):]
+            if not texto.isdigit():
+                return np.empty(0, dtype=np.int64)
+            desde = np.searchsorted(self._ids_ordenados, int(texto), 'left')
+            hasta = np.searchsorted(self._ids_ordenados, int(texto), 'right')
+        else:
+            desde = np.searchsorted(self._ids_ordenados, texto, 'left')
+            hasta = np.searchsorted(self._ids_ordenados, texto + '\U0010ffff', 'left')
+        return np.sort(self._orden_ids[desde:hasta])
+
+    def _mascara(self, filtros):
+        mascara = None
+        for columna, valores in filtros.items():
+            if not valores:
+                continue
+            serie = self.df[columna]
+            admitidos = np.zeros(len(serie.cat.categories) + 1, dtype=bool)
+            admitidos[serie.cat.categories.get_indexer(valores)] = True
+            # El código -1 (vacío) cae en la última posición, que nunca se admite
+            admitidos[-1] = False
+            coincide = admitidos[serie.cat.codes.to_numpy()]
+            mascara = coincide if mascara is None else mascara & coincide
+        return mascara
+
+    def posiciones(self, filtros=None, columna_orden=None, ascendente=True, busqueda=''):
+        """Posiciones de las filas que pasan los filtros, en el orden pedido."""
+        mascara = self._mascara(filtros or {})
+        if busqueda.strip():
+            candidatas = self.buscar(busqueda)
+            return candidatas if mascara is None else candidatas[mascara[candidatas]]
+
+        orden = self.orden(columna_orden or self.columna_id)
+        if not ascendente:
+            orden = orden[::-1]
+        return orden if mascara is None else orden[mascara[orden]]
+
+
+@st.cache_resource(max_entries=8)
+def indice_tabla(df, columna_id):
+    """Índice compartido entre sesiones para cada tabla de detalle."""
+    return IndiceTabla(df, columna_id)
+
+
+def mostrar_tabla_paginada(df, clave, columna_id, columnas_filtro=()):
+    """Tabla de detalle con búsqueda por ID, filtros, orden y paginado del lado del servidor."""
+    indice = indice_tabla(df, columna_id)
+
+    col1, col2, col3, col4 = st.columns([2, 2, 1, 1])
+    busqueda = col1.text_input("🔎 Buscar por ID", key=f'{clave}_busqueda')
+    columna_orden = col2.selectbox("Ordenar por", list(df.columns), key=f'{clave}_orden')
+    ascendente = col3.selectbox("Sentido", ["Ascendente", "Descendente"],
+                                key=f'{clave}_sentido') == "Ascendente"
+    tamano = col4.selectbox("Filas por página", TAMANOS_PAGINA, key=f'{clave}_tamano')
+
+    filtros = {}
+    if columnas_filtro:
+        for col, columna in zip(st.columns(len(columnas_filtro)), columnas_filtro):
+            filtros[columna] = col.multiselect(columna, df[columna].cat.categories.tolist(),
+                                               key=f'{clave}_filtro_{columna}')
+
+    posiciones = indice.posiciones(filtros, columna_orden, ascendente, busqueda)
+    paginas = max(1, -(-len(posiciones) // tamano))
+    if st.session_state.get(f'{clave}_pagina', 1) > paginas:
+        st.session_state[f'{clave}_pagina'] = paginas
+    pagina = st.number_input(f"Página (de {paginas:,})", min_value=1, max_value=paginas,
+                             key=f'{clave}_pagina')
+
+    inicio = (pagina - 1) * tamano
+    visibles = posiciones[inicio:inicio + tamano]
+    st.dataframe(expandir_pasivos(df.iloc[visibles]), use_container_width=True)
+    if len(visibles):
+        st.caption(f"Filas {inicio + 1:,}–{inicio + len(visibles):,} de {len(posiciones):,}"
+                   + (f" (filtradas de {len(df):,})" if len(posiciones) < len(df) else ""))
+    else:
+        st.caption("Ninguna fila coincide con la búsqueda o los filtros.")
+
+
 # =================================================================
 # INTERFAZ PRINCIPAL
 # =================================================================
 
+def iniciar_analisis(clave):
+    """Botón "Iniciar Análisis" que queda activo en la sesión.
+
+    Así los controles de la tabla de detalle (que relanzan el script) no
+    ocultan los resultados que ya se mostraron.
+    """
+    if st.button("🔍 Iniciar Análisis", key=f'{clave}_iniciar'):
+        st.session_state[f'{clave}_analisis'] = True
+    return st.session_state.get(f'{clave}_analisis', False)
+
+
+def incorporar_facturas(df_auditado):
+    """Carga lotes de facturas nuevas y actualiza el análisis de la sesión sin rehacer el histórico."""
+    archivo = st.file_uploader("Facturas nuevas (CSV o Parquet con el esquema de cuentas)",
+                               type=['csv', 'parquet'], key='cuentas_lote')
+    if 'cuentas_incremental' not in st.session_state:
+        st.session_state['cuentas_incremental'] = AnalisisIncremental.desde_analisis(df_auditado)
+        st.session_state['cuentas_lotes'] = {}
+    analisis = st.session_state['cuentas_incremental']
+    lotes = st.session_state['cuentas_lotes']
+
+    if archivo is not None and archivo.file_id not in lotes:
+        extension = '.parquet' if archivo.name.endswith('.parquet') else '.csv'
+        with tempfile.NamedTemporaryFile(suffix=extension) as temporal:
+            temporal.write(archivo.getvalue())
+            temporal.flush()
+            try:
+                lote = cargar_tabla(temporal.name, 'cuentas')
+            except ValueError as error:
+                st.error(str(error).replace(temporal.name, archivo.name))
+                return
+        lotes[archivo.file_id] = analisis.agregar(lote)
+
+    if not lotes:
+        return
+    nuevas = pd.concat(lotes.values(), ignore_index=True)
+    totales = analisis.totales()
+    col1, col2, col3, col4 = st.columns(4)
+    mostrar_metricas(col1, "Facturas Incorporadas", f"{len(nuevas)}")
+    mostrar_metricas(col2, "Monto Pendiente (ARS)", f"${_valores_estado(totales, 'Pendiente')[1]:,.2f}")
+    mostrar_metricas(col3, "Anomalías Nuevas", f"{(nuevas['is_anomaly'] == -1).sum()}")
+    mostrar_metricas(col4, "Anomalías Totales", f"{analisis.anomalias}")
+    st.dataframe(analisis.antiguedad.totales().round(2).T, use_container_width=True)
+    # Cada lote codifica sus IDs con su propio formato: se expanden antes de unirlos
+    vista = pd.concat([expandir_pasivos(lote.head(TAMANOS_PAGINA[-1])) for lote in lotes.values()],
+                      ignore_index=True)
+    st.dataframe(vista.head(TAMANOS_PAGINA[-1]), use_container_width=True, hide_index=True)
+
+
+def encargar_informe(descripcion, nombre_archivo, mime, constructor, **kwargs):
+    """Envía el informe a la cola compartida y lo anota entre los trabajos de la sesión."""
+    id_trabajo = cola_informes().enviar(descripcion, nombre_archivo, mime, _generar_informe, constructor, **kwargs)
+    st.session_state.setdefault('informes_trabajos', []).insert(0, id_trabajo)
+
+
+def mostrar_trabajos():
+    """Avance y descarga de los informes de la sesión; se refresca solo mientras haya alguno en curso."""
+    cola = cola_informes()
+    trabajos = [cola.trabajo(id_trabajo) for id_trabajo in st.session_state.get('informes_trabajos', [])]
+    pendientes = any(trabajo is not None and not trabajo.finalizado for trabajo in trabajos)
+
+    @st.fragment(run_every=1 if pendientes else None)
+    def panel():
+        actuales = [cola.trabajo(id_trabajo) for id_trabajo in st.session_state.get('informes_trabajos', [])]
+        if not actuales:
+            return
+        st.markdown("### ⏳ Informes solicitados")
+        for id_trabajo, trabajo in zip(st.session_state['informes_trabajos'], actuales):
+            if trabajo is None:
+                st.caption("Informe descartado del almacenamiento; vuelva a generarlo.")
+            elif trabajo.estado == 'Terminado':
+                st.download_button(f"⬇️ {trabajo.descripcion}", trabajo.contenido, trabajo.nombre_archivo,
+                                   trabajo.mime, key=f'descarga_{id_trabajo}')
+            elif trabajo.estado == 'Error':
+                st.error(f"{trabajo.descripcion}: {trabajo.error}")
+            else:
+                st.progress(trabajo.progreso, text=f"{trabajo.descripcion}: {trabajo.estado.lower()}"
+                                                   f"{' · ' + trabajo.etapa if trabajo.etapa else ''}")
+        if pendientes and all(trabajo is None or trabajo.finalizado for trabajo in actuales):
+            st.rerun()
+
+    panel()
+
+
+def mostrar_diagnostico():
+    """Panel lateral con las métricas por etapa y las librerías pesadas ya cargadas en este proceso."""
+    with st.sidebar.expander("📦 Librerías cargadas"):
+        st.dataframe(librerias_cargadas(), hide_index=True, use_container_width=True)
+    with st.sidebar.expander("⏱️ Tiempos por etapa", expanded=True):
+        tabla = REGISTRO_METRICAS.tabla()
+        if tabla.empty:
+            st.caption("Todavía no hay mediciones.")
+            return
+        st.dataframe(tabla.round(3), hide_index=True, use_container_width=True)
+        st.download_button("⬇️ Prometheus", REGISTRO_METRICAS.prometheus(),
+                           "metricas_pasivos.prom", "text/plain")
+        st.download_button("⬇️ JSON", REGISTRO_METRICAS.json(),
+                           "metricas_pasivos.json", "application/json")
+        if st.button("🧹 Reiniciar métricas"):
+            REGISTRO_METRICAS.reiniciar()
+
+
 def main():
+    configurar_pagina()
+    
     st.markdown('<h1 class="main-header">💼 Sistema de Auditoría de Pasivos Corrientes</h1>', 
                 unsafe_allow_html=True)
     
@@ -634,6 +3325,7 @@ def main():
     
     st.sidebar.markdown("---")
     st.sidebar.info("💡 **Nota:** Todos los datos son simulados con fines educativos.")
+    diagnostico = st.sidebar.toggle("🩺 Diagnóstico de rendimiento", value=DIAGNOSTICO_ACTIVO)
     
     # PÁGINA DE INICIO
     if modulo == "🏠 Inicio":
@@ -709,16 +3401,8 @@ def main():
             """)
             
             if st.button("📑 PDF Consolidado"):
-                with st.spinner("Generando..."):
-                    datos = generar_datos_consolidados()
-                    pdf_buffer = crear_informe_pdf_simple(datos)
-                    st.success("✅ Generado")
-                    st.download_button(
-                        "⬇️ Descargar PDF",
-                        pdf_buffer,
-                        f"informe_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                        "application/pdf"
-                    )
+                encargar_informe("PDF Consolidado", f"informe_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+                                 "application/pdf", crear_informe_pdf_simple)
         
         with col2:
             st.markdown("### 📈 Informe Excel")
@@ -730,16 +3414,9 @@ def main():
             """)
             
             if st.button("📊 Excel Detallado"):
-                with st.spinner("Generando..."):
-                    datos = generar_datos_consolidados()
-                    excel_buffer = crear_informe_excel(datos)
-                    st.success("✅ Generado")
-                    st.download_button(
-                        "⬇️ Descargar Excel",
-                        excel_buffer,
-                        f"informe_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                    )
+                encargar_informe("Excel Detallado", f"informe_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+                                 "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                                 crear_informe_excel)
         
         with col3:
             st.markdown("### 📋 Informe Profesional")
@@ -748,19 +3425,20 @@ def main():
             - ✅ Normas RT 7, RT 37, NIAs
             - ✅ Procedimientos
             - ✅ Opinión profesional
+            - ✅ Anexos de detalle (opcional)
             """)
             
+            nombre = st.text_input("Empresa auditada", ENTIDAD_EJEMPLO.nombre)
+            cuit = st.text_input("CUIT", ENTIDAD_EJEMPLO.cuit)
+            anexos = st.checkbox("Anexos con facturas vencidas y anomalías")
+            
             if st.button("📑 Informe con Normas"):
-                with st.spinner("Generando informe profesional..."):
-                    datos = generar_datos_consolidados()
-                    pdf_buffer = crear_informe_auditoria_normas(datos)
-                    st.success("✅ Generado")
-                    st.download_button(
-                        "⬇️ Descargar Informe Profesional",
-                        pdf_buffer,
-                        f"informe_auditoria_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                        "application/pdf"
-                    )
+                encargar_informe(f"Informe con Normas ({nombre})",
+                                 f"informe_auditoria_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+                                 "application/pdf", crear_informe_auditoria_normas,
+                                 entidad=Entidad(nombre, cuit), anexos=anexos)
+        
+        mostrar_trabajos()
     
     # DASHBOARD GENERAL
     elif modulo == "📊 Dashboard General":
@@ -769,21 +3447,15 @@ def main():
         if st.button("🔄 Generar Dashboard"):
             with st.spinner("Generando..."):
                 datos = generar_datos_consolidados()
-                df_cuentas = datos['cuentas']
-                df_prestamos = datos['prestamos']
-                df_rrhh = datos['remuneraciones']
-                df_fiscales = datos['fiscales']
+                resumen = calcular_resumen_pasivos(datos)
                 
                 st.success("✅ Dashboard generado")
                 
                 col1, col2, col3, col4 = st.columns(4)
-                mostrar_metricas(col1, "Facturas Pendientes", 
-                               len(df_cuentas[df_cuentas['estado'] == 'Pendiente']))
-                mostrar_metricas(col2, "Préstamos Activos", 
-                               len(df_prestamos[df_prestamos['Estado_Pago'] == 'Activo']))
-                mostrar_metricas(col3, "Empleados", len(df_rrhh))
-                mostrar_metricas(col4, "Impuestos Pendientes", 
-                               len(df_fiscales[df_fiscales['estado_pago'] == 'Pendiente']))
+                mostrar_metricas(col1, "Facturas Pendientes", resumen.cuentas.cantidad)
+                mostrar_metricas(col2, "Préstamos Activos", resumen.prestamos.cantidad)
+                mostrar_metricas(col3, "Empleados", resumen.remuneraciones.cantidad)
+                mostrar_metricas(col4, "Impuestos Pendientes", resumen.fiscales.cantidad)
                 
                 st.markdown("---")
                 st.markdown("### 📈 Análisis Consolidado")
@@ -792,72 +3464,127 @@ def main():
                 
                 with col1:
                     categorias = ['Cuentas\npor Pagar', 'Préstamos', 'Nómina', 'Fiscales']
-                    valores = [
-                        df_cuentas[df_cuentas['estado'] == 'Pendiente']['monto'].sum(),
-                        df_prestamos[df_prestamos['Estado_Pago'] == 'Activo']['Monto_Prestamo'].sum(),
-                        df_rrhh['Salario_Bruto'].sum(),
-                        df_fiscales[df_fiscales['estado_pago'] == 'Pendiente']['monto_ars'].sum()
-                    ]
+                    valores = [rubro.monto for rubro in resumen.rubros]
                     
-                    fig1, ax1 = plt.subplots(figsize=(10, 6))
-                    sns.barplot(x=categorias, y=valores, palette='viridis', ax=ax1)
-                    ax1.set_title('Distribución por Categoría', fontsize=14, fontweight='bold')
-                    plt.xticks(rotation=45, ha='right')
-                    plt.tight_layout()
-                    st.pyplot(fig1)
+                    mostrar_grafico(grafico_barras_png(pd.Series(valores, index=categorias), None, None,
+                                                       'Distribución por Categoría'))
                 
                 with col2:
                     data_top = pd.DataFrame({'Categoría': categorias, 'Monto': valores})
-                    fig2 = crear_grafico_torta(data_top.set_index('Categoría')['Monto'], 
-                                               'Composición de Pasivos')
-                    st.pyplot(fig2)
+                    mostrar_grafico(grafico_torta_png(data_top.set_index('Categoría')['Monto'], 
+                                                      'Composición de Pasivos'))
+                
+                st.markdown("### 🗓️ Próximos Vencimientos Fiscales")
+                calendario = calendario_fiscal(datos['fiscales'])
+                hoy = date.today()
+                
+                col1, col2, col3 = st.columns(3)
+                for col, dias in zip((col1, col2, col3), (7, 30, 90)):
+                    cantidad, monto = calendario.total(hoy, np.datetime64(hoy, 'D') + dias + 1)
+                    mostrar_metricas(col, f"Vencen en {dias} días", f"${monto:,.2f}", f"{cantidad} obligaciones")
+                
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    semanas = calendario.exposicion(hoy, 8).sum(axis=1)
+                    semanas.index = semanas.index.strftime('%d/%m')
+                    mostrar_grafico(grafico_barras_png(semanas, None, None, 'Exposición Semanal', 'Greens_d'))
+                
+                with col2:
+                    diario = calendario.exposicion(hoy, 30, paso=1, ventana=1)
+                    diario = diario[diario.sum(axis=1) > 0]
+                    diario.index = diario.index.strftime('%d/%m/%Y')
+                    st.dataframe(diario.round(2), use_container_width=True)
+                
+                with st.expander("💾 Uso de memoria"):
+                    st.dataframe(reporte_memoria(datos), use_container_width=True)
     
     # CUENTAS POR PAGAR
     elif modulo == "📋 Cuentas por Pagar":
         st.markdown('<h2 class="module-header">Cuentas por Pagar</h2>', unsafe_allow_html=True)
         
-        if st.button("🔍 Iniciar Análisis"):
+        if iniciar_analisis('cuentas'):
             with st.spinner("Analizando..."):
                 df = generar_cuentas_por_pagar()
-                df_auditado = analizar_cuentas_por_pagar(df)
+                df_auditado = convertir_a_ars(analizar_cuentas_por_pagar(df), obtener_cotizaciones())
                 st.success("✅ Análisis completado")
                 
+                totales = _totales_por_estado(df_auditado, 'estado', 'monto_ars')
+                
                 col1, col2, col3, col4 = st.columns(4)
                 mostrar_metricas(col1, "Total Facturas", f"{len(df_auditado)}")
-                mostrar_metricas(col2, "Monto Pendiente", 
-                               f"${df_auditado[df_auditado['estado'] == 'Pendiente']['monto'].sum():,.2f}")
+                mostrar_metricas(col2, "Monto Pendiente (ARS)", 
+                               f"${_valores_estado(totales, 'Pendiente')[1]:,.2f}")
                 mostrar_metricas(col3, "Vencidas", 
-                               f"{len(df_auditado[df_auditado['estado'] == 'Vencida'])}")
+                               f"{_valores_estado(totales, 'Vencida')[0]}")
                 mostrar_metricas(col4, "Anomalías", f"{(df_auditado['is_anomaly'] == -1).sum()}")
                 
                 st.markdown("---")
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    monto_prov = df_auditado.groupby('proveedor')['monto'].sum().sort_values(ascending=False).head(10)
-                    fig1 = crear_grafico_barras(monto_prov, None, None, 'Top 10 Proveedores', 'Blues_d')
-                    st.pyplot(fig1)
+                    monto_prov = df_auditado.groupby('proveedor', observed=True)['monto_ars'].sum().sort_values(ascending=False).head(10)
+                    mostrar_grafico(grafico_barras_png(monto_prov, None, None, 'Top 10 Proveedores', 'Blues_d'))
                 
                 with col2:
                     estado_count = df_auditado['estado'].value_counts()
-                    fig2 = crear_grafico_torta(estado_count, 'Distribución por Estado')
-                    st.pyplot(fig2)
+                    mostrar_grafico(grafico_torta_png(estado_count, 'Distribución por Estado'))
+                
+                st.markdown("### 🔁 Concentración y Posibles Duplicados")
+                concentracion = concentracion_proveedores(df_auditado)
+                ventana = st.number_input("Días entre emisiones", min_value=0, max_value=365,
+                                          value=VENTANA_DUPLICADOS_DIAS, key='cuentas_ventana_duplicados')
+                duplicados = detectar_duplicados(df_auditado, ventana)
+                grupos, facturas, repetido = duplicados.total()
+                
+                col1, col2, col3, col4 = st.columns(4)
+                mostrar_metricas(col1, "HHI Proveedores", f"{concentracion.hhi:,.0f} ({concentracion.nivel})")
+                mostrar_metricas(col2, "Top 5 Proveedores", f"{concentracion.cinco_principales:.1%}")
+                mostrar_metricas(col3, "Grupos Duplicados", f"{grupos:,} ({facturas:,} facturas)")
+                mostrar_metricas(col4, "Monto Repetido (ARS)", f"${repetido:,.2f}")
+                
+                if grupos:
+                    st.dataframe(duplicados.por_proveedor().round(2), use_container_width=True)
+                    mostrar_tabla_paginada(duplicados.candidatas(), 'duplicados', 'id_factura', ('proveedor',))
+                else:
+                    st.caption("No hay facturas del mismo proveedor, moneda y monto en esa ventana.")
+                
+                st.markdown("### ⏳ Antigüedad de Saldos")
+                antiguedad = analizar_antiguedad(df_auditado, date.today())
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    mostrar_grafico(grafico_barras_png(antiguedad.totales()['Monto'], None, None,
+                                                       'Saldo Impago por Tramo (días de atraso)', 'Oranges_d'))
+                
+                with col2:
+                    pagos = antiguedad.proyeccion()['Pagos']
+                    semanales = pagos.groupby(pagos.index.to_period('W').start_time).sum()
+                    semanales.index = semanales.index.strftime('%d/%m')
+                    mostrar_grafico(grafico_barras_png(semanales, None, None,
+                                                       'Pagos Proyectados por Semana', 'Reds_d'))
+                
+                st.dataframe(antiguedad.matriz().round(2), use_container_width=True)
+                
+                with st.expander("➕ Incorporar facturas nuevas"):
+                    incorporar_facturas(df_auditado)
                 
                 st.markdown("### 📋 Detalle")
-                st.dataframe(df_auditado.head(20), use_container_width=True)
+                mostrar_tabla_paginada(df_auditado, 'cuentas', 'id_factura',
+                                       ('estado', 'proveedor', 'tramo_antiguedad'))
     
     # PRÉSTAMOS
     elif modulo == "💰 Préstamos Obtenidos":
         st.markdown('<h2 class="module-header">Préstamos Obtenidos</h2>', unsafe_allow_html=True)
         
-        if st.button("🔍 Iniciar Análisis"):
+        if iniciar_analisis('prestamos'):
             with st.spinner("Analizando..."):
                 df = generar_prestamos()
                 st.success("✅ Análisis completado")
                 
                 col1, col2, col3, col4 = st.columns(4)
                 mostrar_metricas(col1, "Total", f"{len(df)}")
-                mostrar_metricas(col2, "Monto Total", f"${df['Monto_Prestamo'].sum():,.2f}")
+                mostrar_metricas(col2, "Monto Total", f"${_sumar(df['Monto_Prestamo']):,.2f}")
                 mostrar_metricas(col3, "Activos", f"{len(df[df['Estado_Pago'] == 'Activo'])}")
                 mostrar_metricas(col4, "Tasa Prom", f"{df['Tasa_Interes_Anual'].mean():.2%}")
                 
@@ -865,17 +3592,37 @@ def main():
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    fig1, ax1 = plt.subplots(figsize=(10, 6))
-                    sns.histplot(df['Monto_Prestamo'], bins=15, kde=True, color='steelblue', ax=ax1)
-                    ax1.set_title('Distribución de Montos')
-                    plt.tight_layout()
-                    st.pyplot(fig1)
+                    conteos, bordes = np.histogram(_montos_float64(df['Monto_Prestamo']), bins=15)
+                    mostrar_grafico(grafico_histograma_png(conteos, bordes, 'Distribución de Montos',
+                                                           etiqueta='Monto_Prestamo'))
                 
                 with col2:
-                    fig2 = crear_grafico_torta(df['Estado_Pago'].value_counts(), 'Por Estado')
-                    st.pyplot(fig2)
+                    mostrar_grafico(grafico_torta_png(df['Estado_Pago'].value_counts(), 'Por Estado'))
+                
+                st.markdown("---")
+                st.markdown("### 📆 Amortización y Clasificación (RT 7)")
+                sistema = st.radio("Sistema de amortización", list(SISTEMAS_AMORTIZACION),
+                                   format_func=SISTEMAS_AMORTIZACION.get, horizontal=True)
+                hoy = date.today()
+                clasificacion = clasificar_prestamos(df, hoy, sistema)
+                vigentes = df['Estado_Pago'].isin(ESTADOS_PRESTAMO_VIGENTE).to_numpy()
+                en_curso = clasificacion[vigentes]
+                
+                col1, col2, col3, col4 = st.columns(4)
+                mostrar_metricas(col1, "Porción Corriente", f"${en_curso['Porcion_Corriente'].sum():,.2f}")
+                mostrar_metricas(col2, "Porción No Corriente", f"${en_curso['Porcion_No_Corriente'].sum():,.2f}")
+                mostrar_metricas(col3, "Intereses Devengados", f"${en_curso['Intereses_Devengados'].sum():,.2f}")
+                mostrar_metricas(col4, "Saldo de Capital", f"${en_curso['Saldo_Capital'].sum():,.2f}")
+                
+                cronograma = cronograma_prestamos(df[vigentes], sistema)
+                limite = _sumar_meses(np.datetime64(hoy, 'D'), MESES_PORCION_CORRIENTE)
+                fechas = cronograma['Fecha_Vencimiento']
+                proximas = cronograma[(fechas > pd.Timestamp(hoy)) & (fechas <= pd.Timestamp(limite))]
+                pagos = proximas.groupby(proximas['Fecha_Vencimiento'].dt.strftime('%Y-%m'))['Cuota_Total'].sum()
+                if not pagos.empty:
+                    mostrar_grafico(grafico_barras_png(pagos, None, None, 'Cuotas de los Próximos 12 Meses', 'Purples_d'))
                 
-                st.dataframe(df.head(20), use_container_width=True)
+                mostrar_tabla_paginada(df.assign(**clasificacion), 'prestamos', 'ID_Prestamo', ('Estado_Pago',))
     
     # REMUNERACIONES
     elif modulo == "👥 Remuneraciones":
@@ -888,31 +3635,24 @@ def main():
                 
                 col1, col2, col3, col4 = st.columns(4)
                 mostrar_metricas(col1, "Empleados", f"{len(df)}")
-                mostrar_metricas(col2, "Salarios", f"${df['Salario_Bruto'].sum():,.2f}")
-                mostrar_metricas(col3, "Aportes", f"${df['Aportes_Patronales'].sum():,.2f}")
-                mostrar_metricas(col4, "Carga Total", 
-                               f"${(df['Salario_Bruto'].sum() + df['Aportes_Patronales'].sum()):,.2f}")
+                mostrar_metricas(col2, "Salarios", f"${_sumar(df['Salario_Bruto']):,.2f}")
+                mostrar_metricas(col3, "Contribuciones", f"${_sumar(df['Aportes_Patronales']):,.2f}")
+                mostrar_metricas(col4, "Pasivo Total", f"${_sumar(df['Pasivo_Total']):,.2f}")
                 
                 st.markdown("---")
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    fig1, ax1 = plt.subplots(figsize=(10, 6))
-                    sns.boxplot(data=df, x='Departamento', y='Salario_Bruto', palette='Set2', ax=ax1)
-                    ax1.set_title('Por Departamento')
-                    plt.xticks(rotation=45, ha='right')
-                    plt.tight_layout()
-                    st.pyplot(fig1)
+                    estadisticas = _estadisticas_cajas(df, 'Departamento', 'Salario_Bruto')
+                    mostrar_grafico(grafico_cajas_png(estadisticas, 'Por Departamento'))
                 
                 with col2:
-                    cargas = df.groupby('Departamento').agg({
-                        'Salario_Bruto': 'sum',
-                        'Aportes_Patronales': 'sum'
-                    }).reset_index()
-                    cargas['Carga_Total'] = cargas['Salario_Bruto'] + cargas['Aportes_Patronales']
-                    fig2 = crear_grafico_barras(cargas, 'Departamento', 'Carga_Total',
-                                               'Carga Social Total', 'Reds_d')
-                    st.pyplot(fig2)
+                    cargas = df.groupby('Departamento', observed=True)[[
+                        'Salario_Bruto', 'Retenciones', 'Aportes_Patronales', 'SAC_Devengado',
+                        'Vacaciones_Devengadas', 'Cargas_Sobre_Provisiones', 'Pasivo_Total'
+                    ]].sum().reset_index()
+                    mostrar_grafico(grafico_barras_png(cargas, 'Departamento', 'Pasivo_Total',
+                                                       'Pasivo por Departamento', 'Reds_d'))
                 
                 st.dataframe(cargas, use_container_width=True)
     
@@ -920,14 +3660,14 @@ def main():
     elif modulo == "🏛️ Cargas Fiscales":
         st.markdown('<h2 class="module-header">Cargas Fiscales</h2>', unsafe_allow_html=True)
         
-        if st.button("🔍 Iniciar Análisis"):
+        if iniciar_analisis('fiscales'):
             with st.spinner("Analizando..."):
                 df = generar_cargas_fiscales()
                 st.success("✅ Análisis completado")
                 
                 col1, col2, col3, col4 = st.columns(4)
                 mostrar_metricas(col1, "Obligaciones", f"{len(df)}")
-                mostrar_metricas(col2, "Monto Total", f"${df['monto_ars'].sum():,.2f}")
+                mostrar_metricas(col2, "Monto Total", f"${_sumar(df['monto_ars']):,.2f}")
                 mostrar_metricas(col3, "Pendientes", f"{len(df[df['estado_pago'] == 'Pendiente'])}")
                 mostrar_metricas(col4, "Vencidos", f"{len(df[df['estado_pago'] == 'Vencido'])}")
                 
@@ -935,15 +3675,41 @@ def main():
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    monto_tipo = df.groupby('tipo_impuesto')['monto_ars'].sum().sort_values(ascending=False)
-                    fig1 = crear_grafico_barras(monto_tipo, None, None, 'Por Tipo', 'Greens_d')
-                    st.pyplot(fig1)
+                    monto_tipo = df.groupby('tipo_impuesto', observed=True)['monto_ars'].sum().sort_values(ascending=False)
+                    mostrar_grafico(grafico_barras_png(monto_tipo, None, None, 'Por Tipo', 'Greens_d'))
+                
+                with col2:
+                    mostrar_grafico(grafico_torta_png(df['estado_pago'].value_counts(), 'Por Estado'))
+                
+                st.markdown("### 🗓️ Calendario de Vencimientos")
+                calendario = calendario_fiscal(df)
+                hoy = date.today()
+                dias = st.number_input("Próximos días", min_value=1, max_value=365, value=30, key='fiscales_dias')
+                cantidad, monto = calendario.total(hoy, np.datetime64(hoy, 'D') + dias + 1)
+                vencidas = calendario.vencidas_por_tipo(hoy)
+                
+                col1, col2, col3 = st.columns(3)
+                mostrar_metricas(col1, f"Vencen en {dias} días", f"{cantidad}")
+                mostrar_metricas(col2, "Monto a Vencer", f"${monto:,.2f}")
+                mostrar_metricas(col3, "Impago Vencido", f"${vencidas['Monto'].sum():,.2f}")
+                
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    movil = calendario.exposicion(hoy, dias, paso=1).sum(axis=1)
+                    movil.index = movil.index.strftime('%d/%m')
+                    mostrar_grafico(grafico_barras_png(movil, None, None, 'Exposición de los 7 Días Siguientes',
+                                                       'Greens_d'))
                 
                 with col2:
-                    fig2 = crear_grafico_torta(df['estado_pago'].value_counts(), 'Por Estado')
-                    st.pyplot(fig2)
+                    st.markdown("**Impago vencido por tipo**")
+                    st.dataframe(vencidas.round(2), use_container_width=True)
+                
+                st.dataframe(expandir_pasivos(calendario.proximos_vencimientos(hoy, dias).head(TAMANOS_PAGINA[-1])),
+                             use_container_width=True, hide_index=True)
                 
-                st.dataframe(df.head(20), use_container_width=True)
+                st.markdown("### 📋 Detalle")
+                mostrar_tabla_paginada(df, 'fiscales', 'id_impuesto', ('estado_pago', 'tipo_impuesto'))
     
     # Footer
     st.markdown("---")
@@ -953,6 +3719,9 @@ def main():
         <p>Informes con normas RT 7, RT 37 y NIAs</p>
     </div>
     """, unsafe_allow_html=True)
+    
+    if diagnostico:
+        mostrar_diagnostico()
 
 
 if __name__ == '__main__':